@@ -0,0 +1,136 @@
+# api/app/cache.py
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from cachetools import TTLCache
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.db.session import redis_client
+
+logger = logging.getLogger("equitylens-api")
+
+# Stampede protection: only the holder of "<key>:lock" rebuilds a missing key,
+# other callers poll briefly for the fresh value before falling back to the DB.
+LOCK_TTL = 5  # Seconds
+LOCK_POLL_INTERVAL = 0.05  # Seconds
+LOCK_POLL_ATTEMPTS = 20
+
+# Per-worker L1 cache in front of Redis (L2). Its TTL is shorter than Redis',
+# which bounds how long another worker's write can go unnoticed here.
+_L1 = TTLCache(maxsize=settings.L1_CACHE_SIZE, ttl=settings.L1_CACHE_TTL)
+# Per-key locks so concurrent misses within a worker share one L2/DB load.
+# Each lock is dropped once no coroutine holds or waits on it, which the
+# user count tracks (lock.locked() is briefly False with waiters queued).
+_L1_LOCKS: Dict[str, asyncio.Lock] = {}
+_L1_LOCK_USERS: Dict[str, int] = {}
+
+def portfolio_key(portfolio_id: int) -> str:
+    """Cache key for a single portfolio (with positions)"""
+    return f"{settings.CACHE_PREFIX}:portfolio:{portfolio_id}"
+
+def portfolio_list_key(skip: int, limit: int) -> str:
+    """Cache key for one page of the portfolio listing"""
+    return f"{settings.CACHE_PREFIX}:portfolios:list:{skip}:{limit}"
+
+def portfolio_list_prefix() -> str:
+    """Common prefix of every portfolio listing key"""
+    return f"{settings.CACHE_PREFIX}:portfolios:list:"
+
+async def get_or_refresh(
+    key: str,
+    loader: Callable[[], Awaitable[Optional[bytes]]],
+    ttl: int = settings.CACHE_TTL
+) -> Optional[bytes]:
+    """
+    Cache-aside read of a serialized value through the L1 and Redis tiers
+
+    Args:
+        key: Cache key
+        loader: Coroutine function producing the serialized value on a miss,
+            or None if there is nothing to cache (e.g. row not found)
+        ttl: Expiry of the Redis entry in seconds
+
+    Returns:
+        Cached or freshly loaded bytes, or None if the loader found nothing
+    """
+    value = _L1.get(key)
+    if value is not None:
+        return value
+
+    lock = _L1_LOCKS.setdefault(key, asyncio.Lock())
+    _L1_LOCK_USERS[key] = _L1_LOCK_USERS.get(key, 0) + 1
+    try:
+        async with lock:
+            # Another coroutine may have filled L1 while we waited
+            value = _L1.get(key)
+            if value is None:
+                value = await _get_or_refresh_l2(key, loader, ttl)
+                if value is not None:
+                    _L1[key] = value
+    finally:
+        _L1_LOCK_USERS[key] -= 1
+        if not _L1_LOCK_USERS[key]:
+            del _L1_LOCK_USERS[key]
+            del _L1_LOCKS[key]
+
+    return value
+
+async def _get_or_refresh_l2(
+    key: str,
+    loader: Callable[[], Awaitable[Optional[bytes]]],
+    ttl: int
+) -> Optional[bytes]:
+    """Read-through of the shared Redis tier, loading from the source on a miss"""
+    lock_key = f"{key}:lock"
+    have_lock = False
+    try:
+        cached = await redis_client.get(key)
+        if cached is not None:
+            return cached
+
+        have_lock = bool(await redis_client.set(lock_key, 1, nx=True, ex=LOCK_TTL))
+        if not have_lock:
+            # Another request is rebuilding this key; wait for it briefly
+            for _ in range(LOCK_POLL_ATTEMPTS):
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+                cached = await redis_client.get(key)
+                if cached is not None:
+                    return cached
+    except RedisError as e:
+        # The cache is an optimization; never fail a read because Redis is down
+        logger.warning(f"Cache read failed for {key}: {e}")
+        return await loader()
+
+    value = await loader()
+
+    try:
+        if value is not None:
+            await redis_client.set(key, value, ex=ttl)
+        if have_lock:
+            await redis_client.delete(lock_key)
+    except RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
+
+    return value
+
+async def invalidate(*keys: str) -> None:
+    """Remove keys from the cache after a write"""
+    for key in keys:
+        _L1.pop(key, None)
+    try:
+        await redis_client.delete(*keys)
+    except RedisError as e:
+        logger.warning(f"Cache invalidation failed for {keys}: {e}")
+
+async def invalidate_prefix(prefix: str) -> None:
+    """Remove every key starting with prefix (uses SCAN, never KEYS)"""
+    for key in [key for key in _L1 if key.startswith(prefix)]:
+        _L1.pop(key, None)
+    try:
+        keys = [key async for key in redis_client.scan_iter(match=f"{prefix}*")]
+        if keys:
+            await redis_client.delete(*keys)
+    except RedisError as e:
+        logger.warning(f"Cache invalidation failed for {prefix}*: {e}")
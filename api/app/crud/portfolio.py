@@ -1,21 +1,165 @@
 # api/app/crud/portfolio.py
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from itertools import groupby
+from operator import attrgetter
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import Date, Row, bindparam, cast, delete, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload, selectinload
+from sqlalchemy.sql.sqltypes import TIMESTAMP
+from typing import Dict, List, Optional
 from datetime import date
 
+from app.cache import (
+    get_or_refresh,
+    invalidate,
+    invalidate_prefix,
+    portfolio_key,
+    portfolio_list_key,
+    portfolio_list_prefix
+)
 from app.models.portfolio import Portfolio, Position
-from app.schemas.portfolio import PortfolioCreate, PortfolioUpdate, PositionCreate
+from app.schemas.portfolio import (
+    PortfolioCreate,
+    PortfolioUpdate,
+    PortfolioInDB,
+    PortfolioWithPositions,
+    PositionCreate,
+    PositionInDB
+)
+
+def _schema_columns(model):
+    """Table columns with TIMESTAMPs cast to date, matching the created_at/updated_at schema fields"""
+    return [
+        cast(column, Date).label(column.name) if isinstance(column.type, TIMESTAMP) else column
+        for column in model.__table__.columns
+    ]
+
+# Read statements are built once at import time with bound parameters, so each
+# call only binds values and the compiled SQL is reused from the engine cache
+_GET_PORTFOLIO = (
+    select(Portfolio)
+    .options(selectinload(Portfolio.positions))
+    .where(Portfolio.id == bindparam("portfolio_id"))
+)
+_GET_PORTFOLIOS = (
+    select(Portfolio)
+    .options(raiseload(Portfolio.positions))
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+_GET_PORTFOLIOS_WITH_POSITIONS = (
+    select(Portfolio)
+    .options(selectinload(Portfolio.positions))
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+# Plain rows rather than ORM entities, for pages serialized straight to JSON
+_GET_PORTFOLIO_ROWS = (
+    select(*_schema_columns(Portfolio))
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+_GET_POSITIONS = (
+    select(Position)
+    .where(Position.portfolio_id == bindparam("portfolio_id"))
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+# Compiled once; dump_json serializes the whole page in pydantic-core
+_PORTFOLIO_LIST = TypeAdapter(list[PortfolioInDB])
 
 # Portfolio CRUD operations
-def get_portfolio(db: Session, portfolio_id: int):
-    """Get a single portfolio by ID"""
-    return db.query(Portfolio).filter(Portfolio.id == portfolio_id).first()
+async def get_portfolio(db: AsyncSession, portfolio_id: int):
+    """Get a single portfolio by ID, with its positions eagerly loaded"""
+    result = await db.execute(_GET_PORTFOLIO, {"portfolio_id": portfolio_id})
+    return result.scalar_one_or_none()
+
+async def get_portfolios(db: AsyncSession, skip: int = 0, limit: int = 100, with_positions: bool = False):
+    """Get a list of portfolios with pagination
+
+    Positions are batch-loaded with one extra IN query when requested;
+    otherwise the relationship is never traversed, so serializing the list
+    cannot fall into a per-row query.
+    """
+    stmt = _GET_PORTFOLIOS_WITH_POSITIONS if with_positions else _GET_PORTFOLIOS
+    result = await db.scalars(stmt, {"skip": skip, "limit": limit})
+    return result.all()
+
+# Builds the PortfolioWithPositions document server-side in one round trip.
+# Timestamps are cast to date to match the created_at/updated_at schema fields.
+_PORTFOLIO_WITH_POSITIONS_JSON = text("""
+    SELECT jsonb_build_object(
+        'id', p.id,
+        'name', p.name,
+        'description', p.description,
+        'inception_date', p.inception_date,
+        'currency', p.currency,
+        'created_at', p.created_at::date,
+        'updated_at', p.updated_at::date,
+        'positions', coalesce(
+            jsonb_agg(
+                jsonb_build_object(
+                    'id', pos.id,
+                    'portfolio_id', pos.portfolio_id,
+                    'symbol', pos.symbol,
+                    'quantity', pos.quantity,
+                    'entry_date', pos.entry_date,
+                    'entry_price', pos.entry_price,
+                    'exit_date', pos.exit_date,
+                    'exit_price', pos.exit_price,
+                    'created_at', pos.created_at::date,
+                    'updated_at', pos.updated_at::date
+                ) ORDER BY pos.id
+            ) FILTER (WHERE pos.id IS NOT NULL),
+            '[]'::jsonb
+        )
+    )::text
+    FROM portfolios p
+    LEFT JOIN positions pos ON pos.portfolio_id = p.id
+    WHERE p.id = :portfolio_id
+    GROUP BY p.id
+""")
+
+async def get_portfolio_with_positions_json(db: AsyncSession, portfolio_id: int) -> Optional[bytes]:
+    """Get a portfolio with positions as PortfolioWithPositions JSON assembled by Postgres"""
+    result = await db.execute(_PORTFOLIO_WITH_POSITIONS_JSON, {"portfolio_id": portfolio_id})
+    document = result.scalar_one_or_none()
+    return document.encode() if document is not None else None
+
+async def get_portfolio_cached(db: AsyncSession, portfolio_id: int) -> Optional[bytes]:
+    """Get a portfolio with positions as JSON, served from Redis when cached"""
+    return await get_or_refresh(
+        portfolio_key(portfolio_id),
+        lambda: get_portfolio_with_positions_json(db, portfolio_id)
+    )
+
+async def get_portfolios_cached(db: AsyncSession, skip: int = 0, limit: int = 100) -> bytes:
+    """Get a page of portfolios as JSON, served from Redis when cached"""
+    async def load():
+        result = await db.execute(_GET_PORTFOLIO_ROWS, {"skip": skip, "limit": limit})
+        return _PORTFOLIO_LIST.dump_json(
+            _PORTFOLIO_LIST.validate_python(result.all(), from_attributes=True)
+        )
 
-def get_portfolios(db: Session, skip: int = 0, limit: int = 100):
-    """Get a list of portfolios with pagination"""
-    return db.query(Portfolio).offset(skip).limit(limit).all()
+    return await get_or_refresh(portfolio_list_key(skip, limit), load)
 
-def create_portfolio(db: Session, portfolio: PortfolioCreate):
+async def get_portfolios_with_positions(db: AsyncSession, skip: int = 0, limit: int = 100) -> bytes:
+    """Get a page of portfolios with their positions as JSON (two queries in total)"""
+    result = await db.execute(_GET_PORTFOLIO_ROWS, {"skip": skip, "limit": limit})
+    db_portfolios = result.all()
+    positions_by_portfolio = await get_positions_for_portfolios(db, [p.id for p in db_portfolios])
+    return orjson.dumps([
+        PortfolioWithPositions(
+            **PortfolioInDB.model_validate(p).model_dump(),
+            positions=[PositionInDB.model_validate(pos) for pos in positions_by_portfolio.get(p.id, [])]
+        ).model_dump()
+        for p in db_portfolios
+    ])
+
+async def create_portfolio(db: AsyncSession, portfolio: PortfolioCreate):
     """Create a new portfolio"""
     db_portfolio = Portfolio(
         name=portfolio.name,
@@ -24,38 +168,71 @@ def create_portfolio(db: Session, portfolio: PortfolioCreate):
         currency=portfolio.currency
     )
     db.add(db_portfolio)
-    db.commit()
-    db.refresh(db_portfolio)
+    await db.commit()
+    await db.refresh(db_portfolio)
+    await invalidate_prefix(portfolio_list_prefix())
     return db_portfolio
 
-def update_portfolio(db: Session, portfolio_id: int, portfolio: PortfolioUpdate):
-    """Update an existing portfolio"""
-    db_portfolio = get_portfolio(db, portfolio_id)
-    
+async def update_portfolio(db: AsyncSession, portfolio_id: int, portfolio: PortfolioUpdate):
+    """Update an existing portfolio in one UPDATE ... RETURNING; None if it does not exist"""
     # Only update fields that are provided
-    update_data = portfolio.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_portfolio, key, value)
-    
-    db.commit()
-    db.refresh(db_portfolio)
-    return db_portfolio
+    update_data = portfolio.model_dump(exclude_unset=True)
+    if not update_data:
+        return await get_portfolio(db, portfolio_id)
 
-def delete_portfolio(db: Session, portfolio_id: int):
-    """Delete a portfolio"""
-    db_portfolio = get_portfolio(db, portfolio_id)
-    db.delete(db_portfolio)
-    db.commit()
+    result = await db.scalars(
+        update(Portfolio)
+        .where(Portfolio.id == portfolio_id)
+        .values(**update_data)
+        .returning(Portfolio)
+    )
+    db_portfolio = result.one_or_none()
+    await db.commit()
+    if db_portfolio is not None:
+        await invalidate(portfolio_key(portfolio_id))
+        await invalidate_prefix(portfolio_list_prefix())
     return db_portfolio
 
+async def delete_portfolio(db: AsyncSession, portfolio_id: int):
+    """Delete a portfolio; returns the deleted ID, or None if it did not exist"""
+    # Positions go with it through the ON DELETE CASCADE foreign key
+    result = await db.scalars(
+        delete(Portfolio).where(Portfolio.id == portfolio_id).returning(Portfolio.id)
+    )
+    deleted_id = result.one_or_none()
+    await db.commit()
+    if deleted_id is not None:
+        await invalidate(portfolio_key(portfolio_id))
+        await invalidate_prefix(portfolio_list_prefix())
+    return deleted_id
+
 # Position CRUD operations
-def get_positions(db: Session, portfolio_id: int, skip: int = 0, limit: int = 100):
+async def get_positions(db: AsyncSession, portfolio_id: int, skip: int = 0, limit: int = 100):
     """Get positions for a portfolio"""
-    return db.query(Position).filter(
-        Position.portfolio_id == portfolio_id
-    ).offset(skip).limit(limit).all()
+    result = await db.scalars(
+        _GET_POSITIONS,
+        {"portfolio_id": portfolio_id, "skip": skip, "limit": limit}
+    )
+    return result.all()
 
-def create_position(db: Session, position: PositionCreate):
+async def get_positions_for_portfolios(db: AsyncSession, portfolio_ids: List[int]) -> Dict[int, List[Row]]:
+    """Get position rows for several portfolios in one IN-list query, grouped by portfolio ID
+
+    Timestamps are cast to date, so the rows validate as PositionInDB.
+    """
+    if not portfolio_ids:
+        return {}
+    result = await db.execute(
+        select(*_schema_columns(Position))
+        .where(Position.portfolio_id.in_(portfolio_ids))
+        .order_by(Position.portfolio_id, Position.id)
+    )
+    return {
+        portfolio_id: list(group)
+        for portfolio_id, group in groupby(result.all(), key=attrgetter("portfolio_id"))
+    }
+
+async def create_position(db: AsyncSession, position: PositionCreate):
     """Add a position to a portfolio"""
     db_position = Position(
         portfolio_id=position.portfolio_id,
@@ -67,6 +244,20 @@ def create_position(db: Session, position: PositionCreate):
         exit_price=position.exit_price
     )
     db.add(db_position)
-    db.commit()
-    db.refresh(db_position)
-    return db_position
\ No newline at end of file
+    await db.commit()
+    await db.refresh(db_position)
+    await invalidate(portfolio_key(position.portfolio_id))
+    return db_position
+
+async def create_positions(db: AsyncSession, positions: List[PositionCreate]) -> List[Position]:
+    """Add several positions with one multi-row INSERT ... RETURNING and a single commit"""
+    if not positions:
+        return []
+    result = await db.scalars(
+        insert(Position).returning(Position),
+        [position.model_dump() for position in positions]
+    )
+    db_positions = result.all()
+    await db.commit()
+    await invalidate(*{portfolio_key(position.portfolio_id) for position in positions})
+    return db_positions
@@ -1,7 +1,9 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import text
 from app.core.config import settings
+import hashlib
 import logging
 
 # Set up logging
@@ -29,6 +31,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -40,6 +43,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Conditional GET for portfolio reads
+PORTFOLIO_CACHE_CONTROL = "private, max-age=30, stale-while-revalidate=60"
+
+@app.middleware("http")
+async def portfolio_etag_middleware(request: Request, call_next):
+    response = await call_next(request)
+    if (
+        request.method != "GET"
+        or not request.url.path.startswith("/portfolios")
+        or response.status_code != status.HTTP_200_OK
+    ):
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": PORTFOLIO_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in candidates or etag in candidates:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response_headers = dict(response.headers)
+    response_headers.update(headers)
+    return Response(
+        content=body,
+        status_code=response.status_code,
+        headers=response_headers,
+        media_type=response.media_type,
+    )
+
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 async def health_check():
@@ -65,7 +100,7 @@ async def read_root():
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"message": "Internal server error. Please try again later."}
     )
@@ -81,21 +116,36 @@ app.include_router(optimization.router, prefix="/optimization", tags=["Portfolio
 
 # Create database tables on startup if they don't exist
 from app.db.base import Base
-from app.db.session import engine
+from app.db.session import engine, redis_client, warm_pool
+
+# Advisory lock key serializing create_all across workers started together
+SCHEMA_LOCK_KEY = 0x45514C53  # "EQLS"
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up the EquityLens API")
     try:
-        # Create tables if they don't exist
-        # In production, you would use Alembic migrations instead
-        # This is just for development convenience
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created or verified")
+        if settings.ENV == "dev":
+            # Create tables if they don't exist
+            # In production, you would use Alembic migrations instead
+            # This is just for development convenience
+            # Every uvicorn worker runs this at the same moment on first boot;
+            # concurrent CREATE TABLE IF NOT EXISTS can still collide in the
+            # catalog, so take a transaction-scoped lock and let the others
+            # find the tables already there
+            async with engine.begin() as conn:
+                await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+                await conn.run_sync(Base.metadata.create_all)
+            logger.info("Database tables created or verified")
+
+        await warm_pool()
+        logger.info(f"Database pool warmed with {engine.pool.size()} connections")
     except Exception as e:
         logger.error(f"Error during startup: {e}", exc_info=True)
         raise e
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    logger.info("Shutting down the EquityLens API")
\ No newline at end of file
+    logger.info("Shutting down the EquityLens API")
+    await engine.dispose()
+    await redis_client.close()
\ No newline at end of file
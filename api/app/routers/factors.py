@@ -1,6 +1,6 @@
 # api/app/routers/factors.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from datetime import date
 
@@ -9,8 +9,8 @@ from app.db.session import get_db
 router = APIRouter()
 
 @router.get("/")
-def get_factors(
-    db: Session = Depends(get_db)
+async def get_factors(
+    db: AsyncSession = Depends(get_db)
 ):
     """Get available factor models"""
     # This is a placeholder implementation
@@ -22,10 +22,10 @@ def get_factors(
     }
 
 @router.get("/portfolio/{portfolio_id}")
-def get_portfolio_factor_exposures(
+async def get_portfolio_factor_exposures(
     portfolio_id: int,
     factor_model: str = "fama_french_3",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get factor exposures for a portfolio"""
     # This is a placeholder implementation
@@ -1,6 +1,6 @@
 # api/app/routers/optimization.py
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
 
 from app.db.session import get_db
@@ -8,9 +8,9 @@ from app.db.session import get_db
 router = APIRouter()
 
 @router.post("/", status_code=status.HTTP_200_OK)
-def optimize_portfolio(
+async def optimize_portfolio(
     optimization_params: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Optimize portfolio allocation"""
     # This is a placeholder implementation
@@ -1,6 +1,6 @@
 # api/app/routers/performance.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import date
 
@@ -9,11 +9,11 @@ from app.db.session import get_db
 router = APIRouter()
 
 @router.get("/portfolio/{portfolio_id}")
-def get_portfolio_performance(
+async def get_portfolio_performance(
     portfolio_id: int,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get performance metrics for a portfolio"""
     # This is a placeholder implementation
@@ -1,66 +1,99 @@
 # api/app/routers/portfolios.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Response, status
+from typing import List, Literal, Optional, Union
 from datetime import date
+from sqlalchemy.exc import IntegrityError
 
 from app.schemas.portfolio import (
     PortfolioCreate, 
     PortfolioUpdate, 
     PortfolioInDB,
-    PortfolioWithPositions
+    PortfolioWithPositions,
+    PositionBase,
+    PositionCreate,
+    PositionInDB
 )
-from app.db.session import get_db
+from app.db.session import SessionManager
 from app.crud.portfolio import (
     create_portfolio, 
-    get_portfolio, 
-    get_portfolios, 
+    get_portfolio_cached,
+    get_portfolios_cached,
+    get_portfolios_with_positions,
     update_portfolio,
-    delete_portfolio
+    delete_portfolio,
+    create_positions
 )
 
 router = APIRouter()
 
 @router.post("/", response_model=PortfolioInDB, status_code=status.HTTP_201_CREATED)
-def create_new_portfolio(portfolio: PortfolioCreate, db: Session = Depends(get_db)):
+async def create_new_portfolio(portfolio: PortfolioCreate):
     """Create a new portfolio"""
-    return create_portfolio(db=db, portfolio=portfolio)
+    async with SessionManager() as db:
+        return await create_portfolio(db=db, portfolio=portfolio)
 
 @router.get("/{portfolio_id}", response_model=PortfolioWithPositions)
-def read_portfolio(portfolio_id: int, db: Session = Depends(get_db)):
+async def read_portfolio(portfolio_id: int):
     """Get a specific portfolio by ID"""
-    db_portfolio = get_portfolio(db=db, portfolio_id=portfolio_id)
-    if db_portfolio is None:
+    async with SessionManager() as db:
+        payload = await get_portfolio_cached(db=db, portfolio_id=portfolio_id)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Portfolio not found")
-    return db_portfolio
+    # Payload is already serialized PortfolioWithPositions JSON
+    return Response(content=payload, media_type="application/json")
 
-@router.get("/", response_model=List[PortfolioInDB])
-def read_portfolios(
+@router.get("/", response_model=Union[List[PortfolioInDB], List[PortfolioWithPositions]])
+async def read_portfolios(
     skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db)
+    limit: int = 100,
+    include: Optional[Literal["positions"]] = None
 ):
-    """Get list of portfolios"""
-    portfolios = get_portfolios(db=db, skip=skip, limit=limit)
-    return portfolios
+    """Get list of portfolios, with positions embedded when include=positions"""
+    async with SessionManager() as db:
+        if include == "positions":
+            payload = await get_portfolios_with_positions(db=db, skip=skip, limit=limit)
+        else:
+            payload = await get_portfolios_cached(db=db, skip=skip, limit=limit)
+    return Response(content=payload, media_type="application/json")
 
 @router.put("/{portfolio_id}", response_model=PortfolioInDB)
-def update_existing_portfolio(
+async def update_existing_portfolio(
     portfolio_id: int, 
-    portfolio: PortfolioUpdate, 
-    db: Session = Depends(get_db)
+    portfolio: PortfolioUpdate
 ):
     """Update a portfolio"""
-    db_portfolio = get_portfolio(db=db, portfolio_id=portfolio_id)
+    async with SessionManager() as db:
+        db_portfolio = await update_portfolio(db=db, portfolio_id=portfolio_id, portfolio=portfolio)
     if db_portfolio is None:
         raise HTTPException(status_code=404, detail="Portfolio not found")
-    return update_portfolio(db=db, portfolio_id=portfolio_id, portfolio=portfolio)
+    return db_portfolio
 
 @router.delete("/{portfolio_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_existing_portfolio(portfolio_id: int, db: Session = Depends(get_db)):
+async def delete_existing_portfolio(portfolio_id: int):
     """Delete a portfolio"""
-    db_portfolio = get_portfolio(db=db, portfolio_id=portfolio_id)
-    if db_portfolio is None:
+    async with SessionManager() as db:
+        deleted_id = await delete_portfolio(db=db, portfolio_id=portfolio_id)
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Portfolio not found")
-    delete_portfolio(db=db, portfolio_id=portfolio_id)
-    return None
\ No newline at end of file
+    return None
+
+@router.post(
+    "/{portfolio_id}/positions/bulk",
+    response_model=List[PositionInDB],
+    status_code=status.HTTP_201_CREATED
+)
+async def create_portfolio_positions(portfolio_id: int, positions: List[PositionBase]):
+    """Add several positions to a portfolio in one request"""
+    async with SessionManager() as db:
+        try:
+            return await create_positions(
+                db=db,
+                positions=[
+                    PositionCreate(portfolio_id=portfolio_id, **position.model_dump())
+                    for position in positions
+                ]
+            )
+        except IntegrityError:
+            # The portfolio_id foreign key is the only constraint not already
+            # enforced by the schema
+            raise HTTPException(status_code=404, detail="Portfolio not found")
@@ -1,6 +1,6 @@
 # api/app/routers/risk.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
 
 from app.db.session import get_db
@@ -8,9 +8,9 @@ from app.db.session import get_db
 router = APIRouter()
 
 @router.get("/portfolio/{portfolio_id}")
-def get_portfolio_risk(
+async def get_portfolio_risk(
     portfolio_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get risk metrics for a portfolio"""
     # This is a placeholder implementation
@@ -20,10 +20,10 @@ def get_portfolio_risk(
     }
 
 @router.post("/stress-test/{portfolio_id}")
-def run_stress_test(
+async def run_stress_test(
     portfolio_id: int,
     scenario: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Run stress test on a portfolio"""
     # This is a placeholder implementation
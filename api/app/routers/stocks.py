@@ -1,6 +1,6 @@
 # api/app/routers/stocks.py
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import date
 
@@ -9,11 +9,11 @@ from app.db.session import get_db
 router = APIRouter()
 
 @router.get("/")
-def get_stocks(
+async def get_stocks(
     symbol: Optional[str] = None,
     sector: Optional[str] = None,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get list of stocks with optional filtering"""
     # This is a placeholder implementation
@@ -23,11 +23,11 @@ def get_stocks(
     }
 
 @router.get("/{symbol}/history")
-def get_stock_history(
+async def get_stock_history(
     symbol: str,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get historical price data for a stock"""
     # This is a placeholder implementation
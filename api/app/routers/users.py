@@ -1,7 +1,7 @@
 # api/app/routers/users.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from app.db.session import get_db
@@ -10,9 +10,9 @@ router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
 
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Authenticate user and return token"""
     # This is a placeholder implementation
@@ -22,9 +22,9 @@ def login(
     }
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register_user(
+async def register_user(
     # user: UserCreate,  # Uncomment and implement UserCreate schema
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Register a new user"""
     # This is a placeholder implementation
@@ -34,9 +34,9 @@ def register_user(
     }
 
 @router.get("/me")
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current user profile"""
     # This is a placeholder implementation
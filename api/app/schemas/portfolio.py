@@ -1,5 +1,5 @@
 # api/app/schemas/portfolio.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from datetime import date
 
@@ -40,8 +40,7 @@ class PositionInDB(PositionBase):
     created_at: date
     updated_at: date
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Schema for database representation with positions
@@ -50,8 +49,7 @@ class PortfolioInDB(PortfolioBase):
     created_at: date
     updated_at: date
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Schema for portfolio with positions
 class PortfolioWithPositions(PortfolioInDB):
@@ -1,3 +1,117 @@
+# calculation_engine/factors/exposures.py
+import pandas as pd
+import numpy as np
+from numba import njit
+from scipy import stats
+
+@njit(cache=True, fastmath=True)
+def _ols_kernel(X, y):
+    """
+    Compiled OLS core: coefficients, standard errors and fit statistics
+    
+    Args:
+        X: (n, k + 1) C-contiguous float64 design matrix including the constant
+        y: (n,) float64 portfolio returns
+        
+    Returns:
+        Tuple of (coefficients, standard_errors, r_squared, adj_r_squared, df_resid)
+    """
+    n = X.shape[0]
+    df_resid = n - X.shape[1]
+    
+    XtX_inv = np.linalg.inv(X.T @ X)
+    coefficients = XtX_inv @ (X.T @ y)
+    
+    residuals = y - X @ coefficients
+    rss = residuals @ residuals
+    sigma2 = rss / df_resid
+    standard_errors = np.sqrt(np.diag(XtX_inv) * sigma2)
+    
+    demeaned = y - y.mean()
+    r_squared = 1.0 - rss / (demeaned @ demeaned)
+    adj_r_squared = 1.0 - (1.0 - r_squared) * (n - 1) / df_resid
+    
+    return coefficients, standard_errors, r_squared, adj_r_squared, df_resid
+
+@njit(cache=True, fastmath=True)
+def _attribution_kernel(F, beta, portfolio_returns):
+    """
+    Compiled per-period attribution: beta-weighted factor contributions
+    
+    Args:
+        F: (periods, k) float64 factor returns
+        beta: (k,) float64 factor exposures
+        portfolio_returns: (periods,) float64 portfolio returns
+        
+    Returns:
+        Tuple of ((periods, k) contributions, (periods,) specific returns)
+    """
+    periods, k = F.shape
+    contributions = np.empty((periods, k))
+    specific = np.empty(periods)
+    for i in range(periods):
+        total = 0.0
+        for j in range(k):
+            contribution = F[i, j] * beta[j]
+            contributions[i, j] = contribution
+            total += contribution
+        specific[i] = portfolio_returns[i] - total
+    return contributions, specific
+
+def warm_up_kernels():
+    """Compile (or load from the on-disk cache) the Numba kernels on tiny inputs"""
+    X = np.array([[1.0, 0.0], [1.0, 1.0], [1.0, 2.0]])
+    _ols_kernel(X, np.array([0.0, 1.0, 3.0]))
+    _attribution_kernel(np.zeros((1, 1)), np.zeros(1), np.zeros(1))
+
+def _ols(X, y):
+    """
+    Ordinary least squares regression with an intercept
+    
+    Args:
+        X: (n, k) array of factor returns, without a constant column
+        y: (n,) array of portfolio returns
+        
+    Returns:
+        Tuple of (coefficients, t_values, p_values, r_squared, adj_r_squared);
+        element 0 of each array is the intercept
+        
+    Formula:
+        beta = (X'X)^-1 X'y
+        se = sqrt(diag(sigma^2 * (X'X)^-1)), sigma^2 = RSS / (n - k - 1)
+        t = beta / se, p = 2 * (1 - T_cdf(|t|, n - k - 1))
+        R^2 = 1 - RSS / TSS, adj R^2 = 1 - (1 - R^2) * (n - 1) / (n - k - 1)
+    """
+    X_const = np.ascontiguousarray(np.column_stack([np.ones(len(y)), X]), dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    
+    coefficients, standard_errors, r_squared, adj_r_squared, df_resid = _ols_kernel(X_const, y)
+    
+    # Student-t tail probabilities are not available in nopython mode
+    t_values = coefficients / standard_errors
+    p_values = 2 * stats.t.sf(np.abs(t_values), df_resid)
+    
+    return coefficients, t_values, p_values, r_squared, adj_r_squared
+
+def _align(portfolio_returns, factor_returns):
+    """
+    Align portfolio returns with factor returns on their common dates
+    
+    Args:
+        portfolio_returns: Series of portfolio returns
+        factor_returns: DataFrame of factor returns
+        
+    Returns:
+        New DataFrame of factor returns plus a 'portfolio_return' column,
+        restricted to dates present in both inputs
+    """
+    # Index intersection + reindex avoids merge's hash-join bookkeeping;
+    # reindex returns a new frame, so the (cached) factor frame is untouched
+    common_dates = portfolio_returns.index.intersection(factor_returns.index)
+    aligned = factor_returns.reindex(common_dates)
+    aligned['portfolio_return'] = portfolio_returns.reindex(common_dates).to_numpy()
+    return aligned
+
 def calculate_exposures(portfolio_data, factor_returns):
     """
     Calculate portfolio's factor exposures
@@ -14,13 +128,7 @@ def calculate_exposures(portfolio_data, factor_returns):
     portfolio_returns = calculate_portfolio_returns(portfolio_data)
     
     # Align dates between portfolio returns and factor returns
-    aligned_data = pd.merge(
-        portfolio_returns, 
-        factor_returns,
-        left_index=True,
-        right_index=True,
-        how='inner'
-    )
+    aligned_data = _align(portfolio_returns, factor_returns)
     
     if len(aligned_data) < 20:
         raise ValueError("Insufficient data for factor analysis (need at least 20 observations)")
@@ -42,19 +150,13 @@ def calculate_exposures(portfolio_data, factor_returns):
         X = aligned_data[factor_cols].values
         factor_names = factor_cols
     
-    # Add constant for regression
-    X_with_const = sm.add_constant(X)
-    
-    # Run regression
-    model = sm.OLS(y, X_with_const)
-    results = model.fit()
+    # Run regression (with constant)
+    coefficients, t_values, p_values, r_squared, adj_r_squared = _ols(X, y)
     
     # Extract exposures (betas) and statistics
-    exposures = results.params[1:]  # Skip the constant term
-    t_values = results.tvalues[1:]  # t-statistics
-    p_values = results.pvalues[1:]  # p-values
-    r_squared = results.rsquared
-    adj_r_squared = results.rsquared_adj
+    exposures = coefficients[1:]  # Skip the constant term
+    t_values = t_values[1:]  # t-statistics
+    p_values = p_values[1:]  # p-values
     
     # Map exposures to factor names
     exposure_dict = {
@@ -90,20 +192,14 @@ def calculate_attribution(portfolio_data, factor_returns, factor_exposures):
     portfolio_returns = calculate_portfolio_returns(portfolio_data)
     
     # Align dates
-    aligned_data = pd.merge(
-        portfolio_returns, 
-        factor_returns,
-        left_index=True,
-        right_index=True,
-        how='inner'
-    )
+    aligned_data = _align(portfolio_returns, factor_returns)
     
     # Calculate factor contributions to return
     factor_names = list(factor_exposures['factors'].keys())
     factor_betas = {name: factor_exposures['factors'][name]['exposure'] for name in factor_names}
     
     attribution = {
-        'total_return': float(portfolio_returns['portfolio_return'].sum()),
+        'total_return': float(portfolio_returns.sum()),
         'factor_contributions': {},
         'specific_return': 0.0,
         'period_breakdown': []
@@ -125,51 +221,61 @@ def calculate_attribution(portfolio_data, factor_returns, factor_exposures):
         else:
             factor_cols.append(name.lower())
     
-    # Calculate factor contributions
-    total_factor_contribution = 0.0
-    for i, name in enumerate(factor_names):
-        col = factor_cols[i]
-        beta = factor_betas[name]
-        
-        # Factor contribution is beta * factor return
-        factor_return = aligned_data[col].sum()
-        contribution = beta * factor_return
-        total_factor_contribution += contribution
-        
-        attribution['factor_contributions'][name] = {
+    # Calculate factor contributions (beta * total factor return, per factor)
+    beta_vec = np.array([factor_betas[name] for name in factor_names])
+    factor_totals = aligned_data[factor_cols].sum().to_numpy()
+    contributions = factor_totals * beta_vec
+    total_factor_contribution = contributions.sum()
+    
+    attribution['factor_contributions'] = {
+        name: {
             'exposure': float(beta),
             'factor_return': float(factor_return),
             'contribution': float(contribution)
         }
+        for name, beta, factor_return, contribution in zip(
+            factor_names, beta_vec, factor_totals, contributions
+        )
+    }
     
     # Specific (idiosyncratic) return is what's not explained by factors
     specific_return = attribution['total_return'] - total_factor_contribution
     attribution['specific_return'] = float(specific_return)
     
     # Add monthly breakdown for more detailed analysis
-    monthly_data = aligned_data.copy()
-    monthly_data.index = pd.to_datetime(monthly_data.index)
-    monthly_returns = monthly_data.resample('M').apply(
-        lambda x: (1 + x).prod() - 1 if x.name == 'portfolio_return' else x.sum()
+    # Portfolio returns compound (prod(1 + r) - 1 == expm1(sum(log1p(r))))
+    # while factor returns add, so both reduce to resampled sums
+    monthly_index = pd.to_datetime(aligned_data.index)
+    portfolio_monthly = np.expm1(
+        np.log1p(aligned_data['portfolio_return']).set_axis(monthly_index).resample('M').sum()
+    )
+    factor_monthly = aligned_data[factor_cols].set_axis(monthly_index).resample('M').sum()
+    monthly_returns = pd.concat(
+        [portfolio_monthly.rename('portfolio_return'), factor_monthly],
+        axis=1
+    )
+    
+    # Per-period contributions in one compiled pass over (months x factors)
+    monthly_portfolio = monthly_returns['portfolio_return'].to_numpy(dtype=np.float64)
+    monthly_contribs, monthly_specific = _attribution_kernel(
+        np.ascontiguousarray(monthly_returns[factor_cols].to_numpy(dtype=np.float64)),
+        beta_vec.astype(np.float64),
+        monthly_portfolio
     )
     
-    for idx, row in monthly_returns.iterrows():
-        month_contrib = {
-            'period': idx.strftime('%Y-%m'),
-            'portfolio_return': float(row['portfolio_return']),
-            'factor_contributions': {}
+    attribution['period_breakdown'] = [
+        {
+            'period': period,
+            'portfolio_return': float(portfolio_return),
+            'factor_contributions': dict(zip(factor_names, contribs.tolist())),
+            'specific_return': float(specific)
         }
-        
-        month_factor_contrib = 0.0
-        for i, name in enumerate(factor_names):
-            col = factor_cols[i]
-            beta = factor_betas[name]
-            contrib = beta * row[col]
-            month_factor_contrib += contrib
-            
-            month_contrib['factor_contributions'][name] = float(contrib)
-        
-        month_contrib['specific_return'] = float(row['portfolio_return'] - month_factor_contrib)
-        attribution['period_breakdown'].append(month_contrib)
+        for period, portfolio_return, contribs, specific in zip(
+            monthly_returns.index.strftime('%Y-%m'),
+            monthly_portfolio,
+            monthly_contribs,
+            monthly_specific
+        )
+    ]
     
     return attribution
\ No newline at end of file
@@ -1,8 +1,25 @@
 import pandas as pd
 import numpy as np
+from functools import lru_cache
 from sklearn.linear_model import LinearRegression
 import statsmodels.api as sm
 
+# Synthetic factor return parameters: column -> (daily mean, daily std)
+SYNTHETIC_FACTORS = {
+    "fama_french_3": {
+        'mkt_rf': (0.0003, 0.01),   # Market factor (excess market return)
+        'smb': (0.0001, 0.005),     # Size factor (SMB - Small Minus Big)
+        'hml': (0.0002, 0.006),     # Value factor (HML - High Minus Low)
+    },
+    "fama_french_5": {
+        'mkt_rf': (0.0003, 0.01),
+        'smb': (0.0001, 0.005),
+        'hml': (0.0002, 0.006),
+        'rmw': (0.0001, 0.004),     # Profitability (RMW - Robust Minus Weak)
+        'cma': (0.0001, 0.003),     # Investment (CMA - Conservative Minus Aggressive)
+    },
+}
+
 def get_factor_returns(db, factor_model_name, start_date, end_date):
     """
     Get or calculate factor returns for a specified model
@@ -14,73 +31,54 @@ def get_factor_returns(db, factor_model_name, start_date, end_date):
         end_date: End date for factor data
         
     Returns:
-        DataFrame with factor returns time series
+        DataFrame with factor returns time series. The frame is shared between
+        callers requesting the same model and period, so treat it as read-only.
     """
     # Check if we have the factors in our database
     # For now, implement a basic version that calculates them
     
-    if factor_model_name == "fama_french_3":
-        # Get necessary market data to construct factors
-        # 1. Market factor (Market - Risk Free Rate)
-        # 2. SMB (Small Minus Big)
-        # 3. HML (High Minus Low)
-        
-        # Get SPY as market proxy
-        query = """
-        SELECT date, close 
-        FROM market_data.daily_prices 
-        WHERE symbol = 'SPY' 
-        AND date BETWEEN :start_date AND :end_date
-        ORDER BY date
-        """
-        
-        # This is a placeholder - in production you'd query the database
-        # For now, generate synthetic factor data
-        dates = pd.date_range(start=start_date, end=end_date, freq='B')
-        
-        # Create synthetic factor returns
-        np.random.seed(42)  # For reproducibility
-        
-        # Market factor (excess market return)
-        mkt_rf = np.random.normal(0.0003, 0.01, size=len(dates))
-        
-        # Size factor (SMB - Small Minus Big)
-        smb = np.random.normal(0.0001, 0.005, size=len(dates))
-        
-        # Value factor (HML - High Minus Low)
-        hml = np.random.normal(0.0002, 0.006, size=len(dates))
-        
-        # Create DataFrame
-        factors_df = pd.DataFrame({
-            'date': dates,
-            'mkt_rf': mkt_rf,
-            'smb': smb,
-            'hml': hml
-        }).set_index('date')
-        
-        return factors_df
+    # For Fama-French 3, the market factor would be built from SPY prices:
+    #     SELECT date, close FROM market_data.daily_prices
+    #     WHERE symbol = 'SPY' AND date BETWEEN :start_date AND :end_date
+    # This is a placeholder - in production you'd query the database
+    # For now, generate synthetic factor data
+    if factor_model_name not in SYNTHETIC_FACTORS:
+        raise ValueError(f"Unknown factor model: {factor_model_name}")
     
-    elif factor_model_name == "fama_french_5":
-        # Add RMW (Robust Minus Weak) and CMA (Conservative Minus Aggressive)
-        dates = pd.date_range(start=start_date, end=end_date, freq='B')
-        
-        np.random.seed(42)
-        mkt_rf = np.random.normal(0.0003, 0.01, size=len(dates))
-        smb = np.random.normal(0.0001, 0.005, size=len(dates))
-        hml = np.random.normal(0.0002, 0.006, size=len(dates))
-        rmw = np.random.normal(0.0001, 0.004, size=len(dates))
-        cma = np.random.normal(0.0001, 0.003, size=len(dates))
-        
-        factors_df = pd.DataFrame({
-            'date': dates,
-            'mkt_rf': mkt_rf,
-            'smb': smb,
-            'hml': hml,
-            'rmw': rmw,
-            'cma': cma
-        }).set_index('date')
+    # Synthetic data is deterministic for a given model and period, so it is
+    # memoized on date ordinals (hashable regardless of the input date type)
+    return _synthetic_factor_returns(
+        factor_model_name,
+        pd.Timestamp(start_date).toordinal(),
+        pd.Timestamp(end_date).toordinal()
+    )
+
+@lru_cache(maxsize=32)
+def _synthetic_factor_returns(factor_model_name, start_ordinal, end_ordinal):
+    """
+    Generate synthetic daily factor returns for a model and period
+    
+    Args:
+        factor_model_name: Key into SYNTHETIC_FACTORS
+        start_ordinal: Proleptic Gregorian ordinal of the start date
+        end_ordinal: Proleptic Gregorian ordinal of the end date
         
-        return factors_df
+    Returns:
+        DataFrame of factor returns indexed by business day
+    """
+    params = SYNTHETIC_FACTORS[factor_model_name]
+    dates = pd.date_range(
+        start=pd.Timestamp.fromordinal(start_ordinal),
+        end=pd.Timestamp.fromordinal(end_ordinal),
+        freq='B',
+        name='date'
+    )
+    
+    means = np.array([mean for mean, _ in params.values()])
+    stds = np.array([std for _, std in params.values()])
+    
+    # One (days x factors) standard normal draw, scaled per column
+    rng = np.random.default_rng(42)  # For reproducibility
+    factor_returns = rng.standard_normal((len(dates), len(params))) * stds + means
     
-    else:
-        raise ValueError(f"Unknown factor model: {factor_model_name}")
\ No newline at end of file
+    return pd.DataFrame(factor_returns, index=dates, columns=list(params))
@@ -0,0 +1,51 @@
+# calculation_engine/jobs.py
+import os
+import time
+from typing import Any, Dict, Optional
+
+import orjson
+import redis.asyncio as redis
+
+# Job state lives in Redis so any worker (or a restarted process) can answer
+# /job/{job_id}; db 0 is Airflow's broker and db 1 the API cache
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/2")
+JOB_TTL = 3600  # Seconds a job is kept after its last update
+
+redis_client = redis.from_url(REDIS_URL)
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+def _dumps(value) -> bytes:
+    # Results may carry numpy scalars/arrays and non-string (e.g. date) keys
+    return orjson.dumps(
+        value,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        default=str
+    )
+
+async def create_job(job_id: str):
+    """Register a new queued job"""
+    await update_job(
+        job_id,
+        status="queued",
+        progress=0,
+        result=None,
+        error=None,
+        created_at=time.time()
+    )
+
+async def update_job(job_id: str, **fields):
+    """Set job fields (each stored JSON-encoded) and refresh the job's TTL"""
+    key = _job_key(job_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping={name: _dumps(value) for name, value in fields.items()})
+        pipe.expire(key, JOB_TTL)
+        await pipe.execute()
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get a job's fields, or None if it does not exist (or has expired)"""
+    fields = await redis_client.hgetall(_job_key(job_id))
+    if not fields:
+        return None
+    return {name.decode(): orjson.loads(value) for name, value in fields.items()}
@@ -1,4 +1,29 @@
 # calculation_engine/optimization/constraints.py
+import random
+from functools import lru_cache
+
+# Placeholder sectors until the mapping comes from the database
+DUMMY_SECTORS = ['Technology', 'Healthcare', 'Financials', 'Consumer', 'Energy']
+
+@lru_cache(maxsize=256)
+def _assign_dummy_sectors(securities):
+    """
+    Assign each security a pseudo-random placeholder sector
+    
+    Uses a private Random(42) so the assignment is deterministic and never
+    touches the global random state shared with other requests.
+    
+    Args:
+        securities: Tuple of security symbols
+        
+    Returns:
+        Dict of sector name to tuple of symbols (shared; do not mutate)
+    """
+    rng = random.Random(42)  # For reproducibility
+    sector_mapping = {}
+    for security in securities:
+        sector_mapping.setdefault(rng.choice(DUMMY_SECTORS), []).append(security)
+    return {sector: tuple(symbols) for sector, symbols in sector_mapping.items()}
 
 def build_constraint_set(universe_data, constraints_dict):
     """
@@ -16,25 +41,15 @@ def build_constraint_set(universe_data, constraints_dict):
     # Process sector constraints
     if 'sectors' in constraints_dict:
         sectors = constraints_dict['sectors']
-        sector_mapping = {}
         sector_upper = {}
         sector_lower = {}
         
-        # Get list of securities
-        securities = universe_data.columns
-        
         # This would normally come from database
         # For now, assign dummy sectors as a placeholder
-        sectors_list = ['Technology', 'Healthcare', 'Financials', 'Consumer', 'Energy']
-        import random
-        random.seed(42)  # For reproducibility
-        
-        # Assign random sectors for demonstration
-        for security in securities:
-            sector = random.choice(sectors_list)
-            if sector not in sector_mapping:
-                sector_mapping[sector] = []
-            sector_mapping[sector].append(security)
+        sector_mapping = {
+            sector: list(symbols)
+            for sector, symbols in _assign_dummy_sectors(tuple(universe_data.columns)).items()
+        }
         
         for sector_const in sectors:
             sector_name = sector_const['name']
@@ -1,26 +1,111 @@
 # calculation_engine/optimization/efficient_frontier.py
+import hashlib
+import threading
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
 from pypfopt import EfficientFrontier, risk_models, expected_returns
 from pypfopt import objective_functions
 
+# LRU of (mu, S) keyed by a content hash of the prices, shared by every
+# optimizer entry point so repeat calls on a universe skip the covariance
+_MOMENTS_CACHE = OrderedDict()
+_MOMENTS_CACHE_SIZE = 32
+_MOMENTS_CACHE_LOCK = threading.Lock()
+
+def _prices_key(prices_df):
+    """Content hash of a prices DataFrame (values and tickers)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(prices_df.to_numpy(dtype=np.float64)).tobytes())
+    h.update(repr(tuple(prices_df.columns)).encode())
+    return h.digest()
+
 def prepare_optimization_data(prices_df):
     """
     Prepare price data for optimization
     
+    Results are memoized on the content of prices_df; the arrays are
+    returned read-only since they are shared between calls.
+    
     Args:
         prices_df: DataFrame of daily prices for securities
         
     Returns:
-        Tuple of (expected returns, covariance matrix)
+        Tuple of (expected returns array, C-contiguous covariance array,
+        tuple of tickers in array order)
     """
+    key = _prices_key(prices_df)
+    with _MOMENTS_CACHE_LOCK:
+        cached = _MOMENTS_CACHE.get(key)
+        if cached is not None:
+            _MOMENTS_CACHE.move_to_end(key)
+            return cached
+    
     # Calculate expected returns (use mean historical return)
     mu = expected_returns.mean_historical_return(prices_df)
     
     # Calculate sample covariance matrix
     S = risk_models.sample_cov(prices_df)
     
-    return mu, S
+    # Flatten to float64 arrays plus a shared ticker order
+    tickers = tuple(mu.index)
+    mu_arr = mu.to_numpy(dtype=np.float64, copy=True)
+    S_arr = np.ascontiguousarray(S.loc[list(tickers), list(tickers)].to_numpy(dtype=np.float64))
+    mu_arr.setflags(write=False)
+    S_arr.setflags(write=False)
+    result = (mu_arr, S_arr, tickers)
+    
+    with _MOMENTS_CACHE_LOCK:
+        _MOMENTS_CACHE[key] = result
+        if len(_MOMENTS_CACHE) > _MOMENTS_CACHE_SIZE:
+            _MOMENTS_CACHE.popitem(last=False)
+    
+    return result
+
+def _weight_bounds(tickers, constraint_set=None):
+    """
+    Resolve per-asset weight bounds from the position constraints
+    
+    Args:
+        tickers: Tuple of tickers in optimizer order
+        constraint_set: Dictionary of constraints
+        
+    Returns:
+        List of (lower, upper) pairs, one per ticker
+    """
+    position_constraints = (constraint_set or {}).get('position_constraints', {})
+    
+    # Set portfolio-wide limits
+    n = len(tickers)
+    lb = np.full(n, position_constraints.get('min_weight', 0.0), dtype=np.float64)
+    ub = np.full(n, position_constraints.get('max_weight', 1.0), dtype=np.float64)
+    
+    # Override with security-specific limits
+    idx = {ticker: i for i, ticker in enumerate(tickers)}
+    for symbol, limits in position_constraints.get('security_limits', {}).items():
+        if symbol not in idx:
+            continue
+        if 'min' in limits:
+            lb[idx[symbol]] = limits['min']
+        if 'max' in limits:
+            ub[idx[symbol]] = limits['max']
+    
+    # Per-asset pairs rather than an (lb, ub) tuple, which pypfopt would
+    # misread as two asset pairs for a two-asset universe
+    return list(zip(lb.tolist(), ub.tolist()))
+
+def _efficient_frontier(mu_arr, S_arr, tickers, constraint_set=None):
+    """
+    Build an EfficientFrontier with the position limits as its weight bounds
+    
+    mu goes in as a Series only so the weights keep ticker keys.
+    """
+    return EfficientFrontier(
+        pd.Series(mu_arr, index=tickers),
+        S_arr,
+        weight_bounds=_weight_bounds(tickers, constraint_set)
+    )
 
 def maximize_sharpe_ratio(universe_data, constraint_set=None):
     """
@@ -34,14 +119,14 @@ def maximize_sharpe_ratio(universe_data, constraint_set=None):
         Dictionary with optimization results
     """
     # Prepare data
-    mu, S = prepare_optimization_data(universe_data)
+    mu_arr, S_arr, tickers = prepare_optimization_data(universe_data)
     
     # Create efficient frontier object
-    ef = EfficientFrontier(mu, S)
+    ef = _efficient_frontier(mu_arr, S_arr, tickers, constraint_set)
     
     # Apply constraints if provided
     if constraint_set:
-        apply_constraints(ef, constraint_set)
+        apply_constraints(ef, constraint_set, mu_arr)
     
     # Find maximum Sharpe portfolio
     weights = ef.max_sharpe()
@@ -50,15 +135,16 @@ def maximize_sharpe_ratio(universe_data, constraint_set=None):
     cleaned_weights = ef.clean_weights()
     
     # Get performance metrics
-    metrics = get_portfolio_metrics(ef, mu, S, cleaned_weights)
+    metrics = get_portfolio_metrics(mu_arr, S_arr, tickers, cleaned_weights)
+    filtered_weights, weights_sum = _filter_weights(cleaned_weights)
     
     return {
-        'weights': {k: float(v) for k, v in cleaned_weights.items() if v > 0.0001},
+        'weights': filtered_weights,
         'expected_return': float(metrics['expected_return']),
         'volatility': float(metrics['volatility']),
         'sharpe_ratio': float(metrics['sharpe_ratio']),
         'portfolio_value': 1.0,  # Normalized to 1.0
-        'weights_sum': float(sum(cleaned_weights.values())),
+        'weights_sum': weights_sum,
         'optimization_type': 'max_sharpe'
     }
 
@@ -74,14 +160,14 @@ def minimize_volatility(universe_data, constraint_set=None):
         Dictionary with optimization results
     """
     # Prepare data
-    mu, S = prepare_optimization_data(universe_data)
+    mu_arr, S_arr, tickers = prepare_optimization_data(universe_data)
     
     # Create efficient frontier object
-    ef = EfficientFrontier(mu, S)
+    ef = _efficient_frontier(mu_arr, S_arr, tickers, constraint_set)
     
     # Apply constraints if provided
     if constraint_set:
-        apply_constraints(ef, constraint_set)
+        apply_constraints(ef, constraint_set, mu_arr)
     
     # Find minimum volatility portfolio
     weights = ef.min_volatility()
@@ -90,15 +176,16 @@ def minimize_volatility(universe_data, constraint_set=None):
     cleaned_weights = ef.clean_weights()
     
     # Get performance metrics
-    metrics = get_portfolio_metrics(ef, mu, S, cleaned_weights)
+    metrics = get_portfolio_metrics(mu_arr, S_arr, tickers, cleaned_weights)
+    filtered_weights, weights_sum = _filter_weights(cleaned_weights)
     
     return {
-        'weights': {k: float(v) for k, v in cleaned_weights.items() if v > 0.0001},
+        'weights': filtered_weights,
         'expected_return': float(metrics['expected_return']),
         'volatility': float(metrics['volatility']),
         'sharpe_ratio': float(metrics['sharpe_ratio']),
         'portfolio_value': 1.0,  # Normalized to 1.0
-        'weights_sum': float(sum(cleaned_weights.values())),
+        'weights_sum': weights_sum,
         'optimization_type': 'min_volatility'
     }
 
@@ -115,14 +202,14 @@ def maximize_return(universe_data, constraint_set=None, target_volatility=None):
         Dictionary with optimization results
     """
     # Prepare data
-    mu, S = prepare_optimization_data(universe_data)
+    mu_arr, S_arr, tickers = prepare_optimization_data(universe_data)
     
     # Create efficient frontier object
-    ef = EfficientFrontier(mu, S)
+    ef = _efficient_frontier(mu_arr, S_arr, tickers, constraint_set)
     
     # Apply constraints if provided
     if constraint_set:
-        apply_constraints(ef, constraint_set)
+        apply_constraints(ef, constraint_set, mu_arr)
     
     # Find maximum return portfolio (with optional volatility target)
     if target_volatility is not None:
@@ -136,25 +223,30 @@ def maximize_return(universe_data, constraint_set=None, target_volatility=None):
     cleaned_weights = ef.clean_weights()
     
     # Get performance metrics
-    metrics = get_portfolio_metrics(ef, mu, S, cleaned_weights)
+    metrics = get_portfolio_metrics(mu_arr, S_arr, tickers, cleaned_weights)
+    filtered_weights, weights_sum = _filter_weights(cleaned_weights)
     
     return {
-        'weights': {k: float(v) for k, v in cleaned_weights.items() if v > 0.0001},
+        'weights': filtered_weights,
         'expected_return': float(metrics['expected_return']),
         'volatility': float(metrics['volatility']),
         'sharpe_ratio': float(metrics['sharpe_ratio']),
         'portfolio_value': 1.0,  # Normalized to 1.0
-        'weights_sum': float(sum(cleaned_weights.values())),
+        'weights_sum': weights_sum,
         'optimization_type': 'max_return'
     }
 
-def apply_constraints(ef, constraint_set):
+def apply_constraints(ef, constraint_set, mu_arr):
     """
     Apply constraints to an efficient frontier object
     
+    Position limits are not handled here; they are passed to the
+    EfficientFrontier as weight bounds when it is built.
+    
     Args:
         ef: EfficientFrontier object
         constraint_set: Dictionary of constraints
+        mu_arr: Expected returns array, in the EF's ticker order
     """
     # Apply sector constraints if provided
     if 'sector_constraints' in constraint_set:
@@ -172,54 +264,47 @@ def apply_constraints(ef, constraint_set):
         
         ef.add_sector_constraints(sector_mapper, sector_lower, sector_upper)
     
-    # Apply position constraints if provided
-    if 'position_constraints' in constraint_set:
-        position_constraints = constraint_set['position_constraints']
-        
-        # Set portfolio-wide limits
-        min_weight = position_constraints.get('min_weight', 0.0)
-        max_weight = position_constraints.get('max_weight', 1.0)
-        
-        ef.add_constraint(lambda x: x >= min_weight)
-        ef.add_constraint(lambda x: x <= max_weight)
-        
-        # Set security-specific limits
-        for symbol, limits in position_constraints.get('security_limits', {}).items():
-            if 'min' in limits:
-                ef.add_constraint(lambda x, sym=symbol: x[sym] >= limits['min'])
-            if 'max' in limits:
-                ef.add_constraint(lambda x, sym=symbol: x[sym] <= limits['max'])
-    
     # Apply target return constraint if provided
     if 'target_return' in constraint_set:
         target_return = constraint_set['target_return']
-        ef.add_constraint(lambda x: ef.portfolio_return(x) >= target_return)
+        ef.add_constraint(lambda x: mu_arr @ x >= target_return)
+
+def _filter_weights(cleaned_weights):
+    """
+    Drop negligible weights in one vectorized pass
+    
+    Returns:
+        Tuple of (dict of weights above 1e-4, sum of all cleaned weights)
+    """
+    tickers = np.array(list(cleaned_weights.keys()), dtype=object)
+    values = np.fromiter(cleaned_weights.values(), dtype=np.float64, count=len(cleaned_weights))
+    mask = values > 0.0001
+    return dict(zip(tickers[mask].tolist(), values[mask].tolist())), float(values.sum())
+
+def _portfolio_perf(mu_arr, S_arr, w_arr, risk_free_rate=0.02):
+    """Expected return, volatility and Sharpe ratio straight from the arrays"""
+    expected_return = mu_arr @ w_arr
+    volatility = np.sqrt(w_arr @ S_arr @ w_arr)
+    return expected_return, volatility, (expected_return - risk_free_rate) / volatility
 
-def get_portfolio_metrics(ef, mu, S, weights):
+def get_portfolio_metrics(mu_arr, S_arr, tickers, weights):
     """
     Calculate key portfolio metrics from optimized weights
     
     Args:
-        ef: EfficientFrontier object
-        mu: Expected returns
-        S: Covariance matrix
-        weights: Portfolio weights
+        mu_arr: Expected returns array
+        S_arr: Covariance matrix array
+        tickers: Tuple of tickers in array order
+        weights: Portfolio weights keyed by ticker
         
     Returns:
         Dictionary of portfolio performance metrics
     """
-    # Calculate expected return
-    expected_return = ef.portfolio_performance(verbose=False)[0]
-    
-    # Calculate volatility
-    volatility = ef.portfolio_performance(verbose=False)[1]
-    
-    # Calculate Sharpe ratio
-    sharpe_ratio = ef.portfolio_performance(verbose=False)[2]
+    w_arr = np.fromiter((weights[t] for t in tickers), dtype=np.float64, count=len(tickers))
+    expected_return, volatility, sharpe_ratio = _portfolio_perf(mu_arr, S_arr, w_arr)
     
     return {
         'expected_return': expected_return,
         'volatility': volatility,
         'sharpe_ratio': sharpe_ratio
     }
-
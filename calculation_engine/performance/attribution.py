@@ -28,9 +28,9 @@ def calculate_attribution(portfolio_data, benchmark_id=None):
     attribution_data = {}
     
     # Generate random sector contributions (just for demo)
-    np.random.seed(42)  # For reproducibility
+    rng = np.random.default_rng(42)  # For reproducibility, without global state
     total_return = 0.08  # 8% total return
-    sector_contributions = np.random.dirichlet(np.ones(len(sectors))) * total_return
+    sector_contributions = rng.dirichlet(np.ones(len(sectors))) * total_return
     
     # Create attribution result structure
     attribution_data = {
@@ -47,13 +47,20 @@ def calculate_attribution(portfolio_data, benchmark_id=None):
             "return": float(sector_contributions[i] / 0.2)
         }
     
-    # Add security attribution (simplified)
-    for idx, position in positions.iterrows():
-        symbol = position['symbol']
-        attribution_data["security_attribution"][symbol] = {
-            "contribution": float(np.random.uniform(0.001, 0.02)),
-            "weight": float(position['quantity'] / positions['quantity'].sum()),
-            "return": float(np.random.uniform(0.01, 0.2))
+    # Add security attribution (simplified), drawing every security at once
+    n = len(positions)
+    contributions = rng.uniform(0.001, 0.02, n)
+    returns = rng.uniform(0.01, 0.2, n)
+    quantities = positions['quantity'].to_numpy(dtype=np.float64)
+    weights = quantities / quantities.sum()
+    symbols = positions['symbol'].to_numpy()
+    attribution_data["security_attribution"] = {
+        symbol: {
+            "contribution": float(contribution),
+            "weight": float(weight),
+            "return": float(ret)
         }
+        for symbol, contribution, weight, ret in zip(symbols, contributions, weights, returns)
+    }
     
     return attribution_data
\ No newline at end of file
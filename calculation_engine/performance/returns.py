@@ -1,6 +1,56 @@
 # calculation_engine/performance/returns.py
 import pandas as pd
 import numpy as np
+from numba import njit
+
+@njit(cache=True)
+def _growth_and_drawdown(returns):
+    """
+    Compiled single pass over returns: compounded growth and max drawdown
+    
+    Args:
+        returns: (T,) float64 periodic returns
+        
+    Returns:
+        Tuple of (total_return, max_drawdown)
+    """
+    value = 1.0
+    peak = 1.0
+    max_drawdown = 0.0
+    for r in returns:
+        value *= 1.0 + r
+        if value > peak:
+            peak = value
+        drawdown = value / peak - 1.0
+        if drawdown < max_drawdown:
+            max_drawdown = drawdown
+    return value - 1.0, max_drawdown
+
+def _simple_returns(values, index, name=None):
+    """
+    Period-over-period returns of a value series, like pct_change().dropna()
+    
+    A return from a zero value is undefined and is dropped along with any
+    other NaN return, rather than kept as NaN or inf.
+    
+    Args:
+        values: (T,) float64 values
+        index: Index of length T matching values
+        name: Optional name of the returned Series
+        
+    Returns:
+        Series of the T - 1 returns (fewer if some are undefined), indexed
+        by the later period
+    """
+    previous = values[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(previous == 0, np.nan, np.diff(values) / previous)
+    valid = ~np.isnan(returns)
+    return pd.Series(returns[valid], index=index[1:][valid], name=name)
+
+def warm_up_kernels():
+    """Compile (or load from the on-disk cache) the Numba kernels on tiny inputs"""
+    _growth_and_drawdown(np.zeros(1))
 
 def calculate_portfolio_returns(portfolio_data, benchmark_data=None):
     """
@@ -11,33 +61,37 @@ def calculate_portfolio_returns(portfolio_data, benchmark_data=None):
         benchmark_data: Optional benchmark prices
         
     Returns:
-        DataFrame with portfolio returns and benchmark returns if provided
+        Series of portfolio returns named 'portfolio_return', or a DataFrame
+        with 'portfolio_return' and 'benchmark_return' columns when
+        benchmark_data is provided
     """
     positions = portfolio_data['positions']
     prices = portfolio_data['prices']
     
-    # Calculate position values over time
-    position_values = pd.DataFrame()
-    for idx, row in positions.iterrows():
-        symbol = row['symbol']
-        quantity = row['quantity']
-        
-        if symbol in prices.columns:
-            position_values[symbol] = prices[symbol] * quantity
+    # Quantity held per price column (0 for symbols with no position)
+    quantity = (
+        positions.groupby('symbol')['quantity'].sum()
+        .reindex(prices.columns, fill_value=0.0)
+        .to_numpy(dtype=np.float64)
+    )
     
-    # Calculate portfolio value over time
-    portfolio_value = position_values.sum(axis=1)
+    # Portfolio value over time as one matrix-vector product, fusing the
+    # multiply and the sum across positions without a T x N intermediate
+    price_values = prices.to_numpy(dtype=np.float64)
+    portfolio_value = price_values @ quantity
+    if np.isnan(portfolio_value).any():
+        # Missing prices contribute nothing, as with a skipna sum
+        portfolio_value = np.nan_to_num(price_values) @ quantity
     
     # Calculate daily returns
-    portfolio_returns = portfolio_value.pct_change().dropna()
+    result = _simple_returns(portfolio_value, prices.index, name='portfolio_return')
     
-    result = pd.DataFrame({'portfolio_return': portfolio_returns})
-    
-    # Add benchmark if provided
+    # Add benchmark if provided; only then is a column-aligned frame needed
     if benchmark_data is not None:
         # Calculate benchmark returns
-        benchmark_returns = benchmark_data.pct_change().dropna()
-        result['benchmark_return'] = benchmark_returns
+        benchmark_value = benchmark_data.to_numpy(dtype=np.float64)
+        result = result.to_frame()
+        result['benchmark_return'] = _simple_returns(benchmark_value, benchmark_data.index)
         
     return result
 
@@ -59,25 +113,23 @@ def calculate_performance_metrics(portfolio_data, benchmark_id=None):
         pass
     
     # Calculate returns
-    returns_df = calculate_portfolio_returns(portfolio_data, benchmark_data)
+    returns = calculate_portfolio_returns(portfolio_data, benchmark_data)
+    benchmark_returns = None
+    if isinstance(returns, pd.DataFrame):
+        benchmark_returns = returns['benchmark_return']
+        returns = returns['portfolio_return']
     
-    # Calculate metrics
-    total_return = (returns_df['portfolio_return'] + 1).prod() - 1
-    annualized_return = (1 + total_return) ** (252 / len(returns_df)) - 1
-    volatility = returns_df['portfolio_return'].std() * np.sqrt(252)
+    # Calculate metrics; total return and max drawdown share one pass
+    total_return, max_drawdown = _growth_and_drawdown(returns.to_numpy(dtype=np.float64))
+    annualized_return = (1 + total_return) ** (252 / len(returns)) - 1
+    volatility = returns.std() * np.sqrt(252)
     sharpe_ratio = annualized_return / volatility
     
-    # Calculate max drawdown
-    cum_returns = (1 + returns_df['portfolio_return']).cumprod()
-    running_max = cum_returns.cummax()
-    drawdown = (cum_returns / running_max) - 1
-    max_drawdown = drawdown.min()
-    
     # Calculate benchmark-relative metrics if available
     tracking_error = None
     information_ratio = None
-    if 'benchmark_return' in returns_df.columns:
-        excess_returns = returns_df['portfolio_return'] - returns_df['benchmark_return']
+    if benchmark_returns is not None:
+        excess_returns = returns - benchmark_returns
         tracking_error = excess_returns.std() * np.sqrt(252)
         information_ratio = excess_returns.mean() * 252 / tracking_error
     
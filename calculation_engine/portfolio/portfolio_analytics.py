@@ -3,6 +3,19 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List
 
+def _simulate_prices(dates, securities) -> pd.DataFrame:
+    """
+    Generate dummy geometric random-walk prices for a set of securities
+    
+    All securities are drawn in one (T, n) batch and compounded with a
+    single cumprod down the date axis.
+    """
+    rng = np.random.default_rng()
+    start_prices = rng.uniform(50, 500, size=len(securities))
+    daily_returns = rng.normal(0.0005, 0.015, size=(len(dates), len(securities)))
+    prices = start_prices * np.cumprod(1 + daily_returns, axis=0)
+    return pd.DataFrame(prices, index=dates, columns=securities)
+
 def get_portfolio_data(db, portfolio_id: int, start_date, end_date):
     """
     Retrieves portfolio data including positions and historical prices
@@ -30,17 +43,8 @@ def get_portfolio_data(db, portfolio_id: int, start_date, end_date):
     dates = pd.date_range(start=start_date, end=end_date, freq='B')
     securities = list(positions.keys())
     
-    # Create a multi-index DataFrame with dummy price data
-    price_data = {}
-    for security in securities:
-        # Generate some random price movement (just for demo)
-        start_price = np.random.uniform(50, 500)
-        daily_returns = np.random.normal(0.0005, 0.015, size=len(dates))
-        prices = start_price * np.cumprod(1 + daily_returns)
-        
-        price_data[security] = pd.Series(prices, index=dates)
-    
-    prices_df = pd.DataFrame(price_data)
+    # Create a DataFrame with dummy price data (just for demo)
+    prices_df = _simulate_prices(dates, securities)
     
     # Create portfolio DataFrame
     portfolio_df = pd.DataFrame({
@@ -66,14 +70,5 @@ def get_symbols_data(db, symbols: List[str], start_date, end_date):
     
     dates = pd.date_range(start=start_date, end=end_date, freq='B')
     
-    # Create a DataFrame with dummy price data
-    price_data = {}
-    for symbol in symbols:
-        # Generate some random price movement (just for demo)
-        start_price = np.random.uniform(50, 500)
-        daily_returns = np.random.normal(0.0005, 0.015, size=len(dates))
-        prices = start_price * np.cumprod(1 + daily_returns)
-        
-        price_data[symbol] = pd.Series(prices, index=dates)
-    
-    return pd.DataFrame(price_data)
\ No newline at end of file
+    # Create a DataFrame with dummy price data (just for demo)
+    return _simulate_prices(dates, list(symbols))
\ No newline at end of file
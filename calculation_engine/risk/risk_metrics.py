@@ -1,114 +1,324 @@
 # calculation_engine/risk/risk_metrics.py
+import hashlib
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
 import pandas as pd
 import numpy as np
+from numba import njit
 from scipy import stats
 
-def calculate_var(db, portfolio_id, confidence_level=0.95, method='historical', lookback_days=252, **kwargs):
+@njit(cache=True)
+def _risk_moments(returns):
     """
-    Calculate Value at Risk (VaR) for a portfolio
+    Compiled return moments: mean and sample volatility plus skew and excess
+    kurtosis with the same (biased) definitions as scipy.stats defaults
+    
+    Degenerate inputs give NaN like pandas/scipy instead of dividing by zero:
+    every moment for an empty window, volatility for a single observation,
+    and skew and kurtosis when the returns are constant.
+    
+    Args:
+        returns: (n,) float64 returns
+        
+    Returns:
+        Tuple of (mean, volatility, skewness, kurtosis)
+    """
+    n = returns.size
+    if n == 0:
+        return np.nan, np.nan, np.nan, np.nan
+    
+    mean = 0.0
+    for r in returns:
+        mean += r
+    mean /= n
+    
+    m2 = 0.0
+    m3 = 0.0
+    m4 = 0.0
+    for r in returns:
+        d = r - mean
+        d2 = d * d
+        m2 += d2
+        m3 += d2 * d
+        m4 += d2 * d2
+    volatility = np.sqrt(m2 / (n - 1)) if n > 1 else np.nan
+    m2 /= n
+    m3 /= n
+    m4 /= n
+    # Constant returns, with scipy's tolerance for rounding in the mean
+    if m2 <= (1e-15 * mean) ** 2:
+        return mean, volatility, np.nan, np.nan
+    return mean, volatility, m3 / m2 ** 1.5, m4 / (m2 * m2) - 3.0
+
+def warm_up_kernels():
+    """Compile (or load from the on-disk cache) the Numba kernels on tiny inputs"""
+    _risk_moments(np.array([0.0, 1.0, 3.0]))
+
+@lru_cache(maxsize=32)
+def _norm_ppf_pdf(confidence_level):
+    """Standard normal z-score of the VaR tail and its density, memoized per level"""
+    z_score = stats.norm.ppf(1 - confidence_level)
+    return float(z_score), float(stats.norm.pdf(z_score))
+
+# Cholesky factors keyed by a content hash of the covariance matrix, so
+# repeat simulations on the same universe skip the O(n^3) decomposition
+_CHOLESKY_CACHE = OrderedDict()
+_CHOLESKY_CACHE_SIZE = 32
+
+def _cholesky(cov):
+    """
+    Lower-triangular Cholesky factor of a covariance matrix, memoized on content
+    
+    Args:
+        cov: (n, n) float64 covariance matrix
+        
+    Returns:
+        Read-only (n, n) array L with L @ L.T == cov
+    """
+    cov = np.ascontiguousarray(cov, dtype=np.float64)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(cov.shape).encode())
+    h.update(cov.tobytes())
+    key = h.digest()
+    
+    L = _CHOLESKY_CACHE.get(key)
+    if L is not None:
+        _CHOLESKY_CACHE.move_to_end(key)
+        return L
+    
+    L = np.linalg.cholesky(cov)
+    L.setflags(write=False)
+    _CHOLESKY_CACHE[key] = L
+    if len(_CHOLESKY_CACHE) > _CHOLESKY_CACHE_SIZE:
+        _CHOLESKY_CACHE.popitem(last=False)
+    return L
+
+def _simulated_var_cvar(simulated_returns, confidence_level):
+    """
+    VaR and CVaR (as positive values) from simulated returns
+    
+    VaR is the k-th order statistic; partitioning is O(N) and leaves the
+    k worst outcomes in front of it for the CVaR mean.
+    """
+    num_simulations = len(simulated_returns)
+    k = min(int((1 - confidence_level) * num_simulations), num_simulations - 1)
+    tail = np.partition(simulated_returns, k)[:k + 1]
+    return -tail[k], -tail.mean()
+
+# Portfolio data and returns per (portfolio, lookback), so several VaR methods
+# in one request (or on one dashboard) load the returns only once. Entries
+# expire after _RETURNS_CACHE_TTL seconds, so new prices and position changes
+# show up within that time (each pool worker holds its own copy).
+_RETURNS_CACHE = OrderedDict()
+_RETURNS_CACHE_SIZE = 64
+_RETURNS_CACHE_TTL = 300
+
+def _load_portfolio_returns(db, portfolio_id, lookback_days):
+    """
+    Load portfolio data and its lookback-limited returns, memoized briefly
     
     Args:
         db: Database session
         portfolio_id: Portfolio identifier
-        confidence_level: Confidence level (e.g., 0.95 for 95% VaR)
-        method: Calculation method ('historical', 'parametric', 'monte_carlo')
         lookback_days: Historical lookback period in trading days
         
     Returns:
-        Dictionary with VaR results
+        Tuple of (portfolio data, Series of portfolio returns)
     """
-    # Get portfolio data
+    now = time.monotonic()
+    key = (portfolio_id, lookback_days)
+    cached = _RETURNS_CACHE.get(key)
+    if cached is not None:
+        expires_at, result = cached
+        if now < expires_at:
+            _RETURNS_CACHE.move_to_end(key)
+            return result
+        del _RETURNS_CACHE[key]
+    
+    # Get portfolio data for the lookback window ending today
     from calculation_engine.portfolio import portfolio_analytics
-    portfolio_data = portfolio_analytics.get_portfolio_data(db, portfolio_id, 
-                                                          start_date=None,  # Will be calculated based on lookback
-                                                          end_date=None)    # Current date
+    today = pd.Timestamp.today().normalize()
+    portfolio_data = portfolio_analytics.get_portfolio_data(db, portfolio_id,
+                                                          start_date=today - pd.offsets.BDay(lookback_days),
+                                                          end_date=today)
     
     # Calculate portfolio returns
     from calculation_engine.performance.returns import calculate_portfolio_returns
-    returns_df = calculate_portfolio_returns(portfolio_data)
+    returns = calculate_portfolio_returns(portfolio_data)
     
     # Limit to lookback period
-    if len(returns_df) > lookback_days:
-        returns_df = returns_df.iloc[-lookback_days:]
+    if len(returns) > lookback_days:
+        returns = returns.iloc[-lookback_days:]
     
+    _RETURNS_CACHE[key] = (now + _RETURNS_CACHE_TTL, (portfolio_data, returns))
+    if len(_RETURNS_CACHE) > _RETURNS_CACHE_SIZE:
+        _RETURNS_CACHE.popitem(last=False)
+    return portfolio_data, returns
+
+def _method_dispatch(portfolio_data, returns, method, confidence_level, lookback_days, **kwargs):
+    """Run one VaR estimator on already loaded portfolio returns"""
     if method == 'historical':
         # Historical simulation method
-        var_result = calculate_historical_var(returns_df, confidence_level)
+        return calculate_historical_var(returns, confidence_level)
     
     elif method == 'parametric':
         # Parametric (variance-covariance) method
-        var_result = calculate_parametric_var(returns_df, confidence_level)
+        return calculate_parametric_var(returns, confidence_level)
     
     elif method == 'monte_carlo':
         # Monte Carlo simulation method
         num_simulations = kwargs.get('num_simulations', 10000)
-        var_result = calculate_monte_carlo_var(returns_df, confidence_level, num_simulations)
+        return calculate_monte_carlo_var(returns, confidence_level, num_simulations)
+    
+    elif method == 'monte_carlo_multi_asset':
+        # Correlated per-asset simulation, aggregated with current weights
+        num_simulations = kwargs.get('num_simulations', 10000)
+        prices = portfolio_data['prices']
+        asset_returns = prices.pct_change().iloc[1:].iloc[-lookback_days:]
+        quantity = (
+            portfolio_data['positions'].groupby('symbol')['quantity'].sum()
+            .reindex(prices.columns, fill_value=0.0)
+            .to_numpy(dtype=np.float64)
+        )
+        holdings = quantity * prices.iloc[-1].to_numpy(dtype=np.float64)
+        return calculate_monte_carlo_var_multi_asset(
+            asset_returns, holdings / holdings.sum(), confidence_level, num_simulations
+        )
     
-    else:
-        raise ValueError(f"Unknown VaR method: {method}")
+    raise ValueError(f"Unknown VaR method: {method}")
+
+def calculate_var(db, portfolio_id, confidence_level=0.95, method='historical', lookback_days=252, **kwargs):
+    """
+    Calculate Value at Risk (VaR) for a portfolio
     
-    return var_result
+    Args:
+        db: Database session
+        portfolio_id: Portfolio identifier
+        confidence_level: Confidence level (e.g., 0.95 for 95% VaR)
+        method: Calculation method ('historical', 'parametric', 'monte_carlo',
+            'monte_carlo_multi_asset')
+        lookback_days: Historical lookback period in trading days
+        
+    Returns:
+        Dictionary with VaR results
+    """
+    portfolio_data, returns = _load_portfolio_returns(db, portfolio_id, lookback_days)
+    return _method_dispatch(portfolio_data, returns, method, confidence_level, lookback_days, **kwargs)
 
-def calculate_historical_var(returns_df, confidence_level=0.95):
+def calculate_var_all(db, portfolio_id, methods=('historical', 'parametric', 'monte_carlo'),
+                      confidence_level=0.95, lookback_days=252, **kwargs):
+    """
+    Calculate VaR with several methods on one shared set of portfolio returns
+    
+    Args:
+        db: Database session
+        portfolio_id: Portfolio identifier
+        methods: Calculation methods to run (see calculate_var)
+        confidence_level: Confidence level (e.g., 0.95 for 95% VaR)
+        lookback_days: Historical lookback period in trading days
+        
+    Returns:
+        Dictionary of method name to VaR results
+    """
+    portfolio_data, returns = _load_portfolio_returns(db, portfolio_id, lookback_days)
+    return {
+        method: _method_dispatch(portfolio_data, returns, method, confidence_level, lookback_days, **kwargs)
+        for method in methods
+    }
+
+def calculate_historical_var(returns, confidence_level=0.95):
     """
     Calculate historical VaR from return series
     
     Args:
-        returns_df: DataFrame with portfolio returns
+        returns: Series of portfolio returns
         confidence_level: Confidence level (e.g., 0.95 for 95% VaR)
         
     Returns:
         Dictionary with VaR results
     """
-    # Sort returns for percentile calculation
-    sorted_returns = returns_df['portfolio_return'].sort_values()
+    return calculate_historical_var_batch(returns, [confidence_level])[0]
+
+def calculate_historical_var_batch(returns, confidence_levels):
+    """
+    Calculate historical VaR at several confidence levels from one sort
     
-    # Find the return at the specified percentile
-    var_percentile = 1 - confidence_level
-    var_value = sorted_returns.quantile(var_percentile)
+    Args:
+        returns: Series of portfolio returns
+        confidence_levels: Iterable of confidence levels (e.g., [0.95, 0.99])
+        
+    Returns:
+        List of VaR result dictionaries, in the order of confidence_levels
+    """
+    values = returns.to_numpy()
+    n = len(values)
     
-    # Calculate Expected Shortfall (CVaR)
-    cvar_value = sorted_returns[sorted_returns <= var_value].mean()
+    # Sort once; every VaR is then an index lookup and every CVaR a
+    # prefix mean read off the cumulative sum
+    sorted_values = np.sort(values)
+    cumulative = np.cumsum(sorted_values)
     
-    # Return VaR and related metrics as positive values
-    return {
-        'var': float(-var_value),  # Convert to positive value
-        'cvar': float(-cvar_value) if not pd.isna(cvar_value) else None,  # Convert to positive value
-        'confidence_level': float(confidence_level),
-        'method': 'historical',
-        'observations': len(returns_df),
-        'var_percentile': float(var_percentile),
-        # Additional metrics
-        'mean_return': float(returns_df['portfolio_return'].mean()),
-        'volatility': float(returns_df['portfolio_return'].std()),
-        'skewness': float(stats.skew(returns_df['portfolio_return'])),
-        'kurtosis': float(stats.kurtosis(returns_df['portfolio_return']))
+    # Distribution moments are shared by every level
+    mean_return, std_return, skewness, kurtosis = _risk_moments(values.astype(np.float64, copy=False))
+    moments = {
+        'mean_return': float(mean_return),
+        'volatility': float(std_return),
+        'skewness': float(skewness),
+        'kurtosis': float(kurtosis)
     }
+    
+    results = []
+    for confidence_level in confidence_levels:
+        var_percentile = 1 - confidence_level
+        if n == 0:
+            # Empty window: nothing to take a percentile of
+            var_value = cvar_value = np.nan
+        else:
+            # Lower order statistic at the specified percentile
+            var_value = sorted_values[int(np.floor(var_percentile * (n - 1)))]
+            
+            # Calculate Expected Shortfall (CVaR) over returns at or below VaR
+            tail_size = np.searchsorted(sorted_values, var_value, side='right')
+            cvar_value = cumulative[tail_size - 1] / tail_size
+        
+        # Return VaR and related metrics as positive values
+        results.append({
+            'var': float(-var_value) if not pd.isna(var_value) else None,  # Convert to positive value
+            'cvar': float(-cvar_value) if not pd.isna(cvar_value) else None,  # Convert to positive value
+            'confidence_level': float(confidence_level),
+            'method': 'historical',
+            'observations': n,
+            'var_percentile': float(var_percentile),
+            # Additional metrics
+            **moments
+        })
+    
+    return results
 
-def calculate_parametric_var(returns_df, confidence_level=0.95):
+def calculate_parametric_var(returns, confidence_level=0.95):
     """
     Calculate parametric VaR assuming normal distribution
     
     Args:
-        returns_df: DataFrame with portfolio returns
+        returns: Series of portfolio returns
         confidence_level: Confidence level (e.g., 0.95 for 95% VaR)
         
     Returns:
         Dictionary with VaR results
     """
     # Calculate mean and standard deviation
-    mean_return = returns_df['portfolio_return'].mean()
-    std_return = returns_df['portfolio_return'].std()
+    mean_return, std_return, _, _ = _risk_moments(returns.to_numpy(dtype=np.float64))
     
     # Calculate Z-score for the given confidence level
-    z_score = stats.norm.ppf(1 - confidence_level)
+    z_score, z_pdf = _norm_ppf_pdf(confidence_level)
     
     # Calculate VaR
     var_value = -(mean_return + z_score * std_return)
     
     # Calculate CVaR (Expected Shortfall)
     # For normal distribution, CVaR = mean - std * pdf(z) / (1 - confidence_level)
-    z_pdf = stats.norm.pdf(z_score)
     cvar_value = -(mean_return - std_return * z_pdf / (1 - confidence_level))
     
     return {
@@ -116,7 +326,7 @@ def calculate_parametric_var(returns_df, confidence_level=0.95):
         'cvar': float(cvar_value),  # Already positive
         'confidence_level': float(confidence_level),
         'method': 'parametric',
-        'observations': len(returns_df),
+        'observations': len(returns),
         'var_percentile': float(1 - confidence_level),
         # Distribution parameters
         'mean_return': float(mean_return),
@@ -124,12 +334,12 @@ def calculate_parametric_var(returns_df, confidence_level=0.95):
         'z_score': float(z_score)
     }
 
-def calculate_monte_carlo_var(returns_df, confidence_level=0.95, num_simulations=10000):
+def calculate_monte_carlo_var(returns, confidence_level=0.95, num_simulations=10000):
     """
     Calculate VaR using Monte Carlo simulation
     
     Args:
-        returns_df: DataFrame with portfolio returns
+        returns: Series of portfolio returns
         confidence_level: Confidence level (e.g., 0.95 for 95% VaR)
         num_simulations: Number of Monte Carlo simulations
         
@@ -137,26 +347,22 @@ def calculate_monte_carlo_var(returns_df, confidence_level=0.95, num_simulations
         Dictionary with VaR results
     """
     # Calculate mean and standard deviation
-    mean_return = returns_df['portfolio_return'].mean()
-    std_return = returns_df['portfolio_return'].std()
+    mean_return, std_return, _, _ = _risk_moments(returns.to_numpy(dtype=np.float64))
     
     # Generate random normal returns
-    np.random.seed(42)  # For reproducibility
-    simulated_returns = np.random.normal(mean_return, std_return, num_simulations)
+    rng = np.random.default_rng(42)  # For reproducibility
+    simulated_returns = rng.normal(mean_return, std_return, num_simulations)
     
-    # Calculate VaR
+    # Calculate VaR and CVaR
     var_percentile = 1 - confidence_level
-    var_value = -np.percentile(simulated_returns, var_percentile * 100)
-    
-    # Calculate CVaR
-    cvar_value = -np.mean(simulated_returns[simulated_returns <= -var_value])
+    var_value, cvar_value = _simulated_var_cvar(simulated_returns, confidence_level)
     
     return {
         'var': float(var_value),  # Already positive
         'cvar': float(cvar_value),  # Already positive
         'confidence_level': float(confidence_level),
         'method': 'monte_carlo',
-        'observations': len(returns_df),
+        'observations': len(returns),
         'simulations': num_simulations,
         'var_percentile': float(var_percentile),
         # Simulation parameters
@@ -164,3 +370,45 @@ def calculate_monte_carlo_var(returns_df, confidence_level=0.95, num_simulations
         'volatility': float(std_return)
     }
 
+def calculate_monte_carlo_var_multi_asset(asset_returns, weights, confidence_level=0.95, num_simulations=10000):
+    """
+    Calculate VaR by simulating correlated asset returns
+    
+    Samples are drawn as Z @ L.T + mu from a Cholesky factor L of the
+    asset covariance, cached across calls, rather than through
+    multivariate_normal, which decomposes the covariance on every call.
+    
+    Args:
+        asset_returns: DataFrame of periodic returns, one column per asset
+        weights: Array of portfolio weights in asset_returns column order
+        confidence_level: Confidence level (e.g., 0.95 for 95% VaR)
+        num_simulations: Number of Monte Carlo simulations
+        
+    Returns:
+        Dictionary with VaR results
+    """
+    mu = asset_returns.mean().to_numpy(dtype=np.float64)
+    L = _cholesky(asset_returns.cov().to_numpy(dtype=np.float64))
+    weights = np.asarray(weights, dtype=np.float64)
+    
+    # Generate correlated asset returns and aggregate to the portfolio
+    rng = np.random.default_rng(42)  # For reproducibility
+    z = rng.standard_normal((num_simulations, len(mu)))
+    simulated_returns = (z @ L.T + mu) @ weights
+    
+    # Calculate VaR and CVaR
+    var_percentile = 1 - confidence_level
+    var_value, cvar_value = _simulated_var_cvar(simulated_returns, confidence_level)
+    
+    return {
+        'var': float(var_value),  # Already positive
+        'cvar': float(cvar_value),  # Already positive
+        'confidence_level': float(confidence_level),
+        'method': 'monte_carlo_multi_asset',
+        'observations': len(asset_returns),
+        'simulations': num_simulations,
+        'var_percentile': float(var_percentile),
+        # Simulation parameters
+        'mean_return': float(mu @ weights),
+        'volatility': float(np.sqrt(weights @ L @ L.T @ weights))
+    }
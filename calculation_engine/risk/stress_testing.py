@@ -1,4 +1,101 @@
 # calculation_engine/risk/stress_testing.py
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import numpy as np
+from numba import njit
+
+logger = logging.getLogger("calculation-engine")
+
+# Historical scenarios, loaded once per process from a data file so the
+# scenario library can grow without code changes ('_default' applies to
+# assets a scenario does not list)
+SCENARIOS_PATH = os.path.join(os.path.dirname(__file__), 'historical_scenarios.json')
+
+def _load_scenarios(path):
+    with open(path) as f:
+        scenarios = json.load(f)
+    for scenario in scenarios.values():
+        scenario['period'] = tuple(scenario['period'])
+    return scenarios
+
+HISTORICAL_SCENARIOS = _load_scenarios(SCENARIOS_PATH)
+
+# Each scenario's listed asset returns as a Series (ready to reindex onto a
+# portfolio's symbols) plus the scenario default, built once at import
+_SCENARIO_SHOCKS = {
+    name: (
+        pd.Series(
+            {k: v for k, v in scenario['asset_returns'].items() if k != '_default'},
+            dtype=np.float64
+        ),
+        scenario['asset_returns']['_default']
+    )
+    for name, scenario in HISTORICAL_SCENARIOS.items()
+}
+
+# Sample factor betas for demonstration; in a real implementation these would
+# be retrieved from the database or calculated using the factor model
+FACTOR_BETAS = {
+    'Market': 1.05,
+    'Size': 0.2,
+    'Value': -0.15,
+    'Momentum': 0.1,
+    'Quality': 0.25,
+    'Volatility': -0.3
+}
+_FACTOR_KEYS = tuple(FACTOR_BETAS)
+_FACTOR_BETAS = np.array(list(FACTOR_BETAS.values()))
+
+@njit(cache=True, fastmath=True)
+def _apply_shocks(quantities, latest_prices, shocks):
+    """
+    Compiled position valuation and shock application with no temporaries
+    
+    Quantities and prices are stored as float32; every product and sum is
+    carried out in float64 and every output is float64, so reported values
+    don't pick up float32 rounding error.
+    
+    Args:
+        quantities: (n,) float32 position quantities
+        latest_prices: (n,) float32 latest prices
+        shocks: (scenarios, n) float64 shock returns
+        
+    Returns:
+        Tuple of ((n,) current values, (scenarios, n) stressed values,
+        portfolio value, (scenarios,) stressed portfolio values), all float64
+    """
+    n = quantities.size
+    current_values = np.empty(n)
+    portfolio_value = 0.0
+    for j in range(n):
+        value = np.float64(quantities[j]) * np.float64(latest_prices[j])
+        current_values[j] = value
+        portfolio_value += value
+    
+    scenarios = shocks.shape[0]
+    stressed = np.empty((scenarios, n))
+    stressed_totals = np.zeros(scenarios)
+    for i in range(scenarios):
+        total = 0.0
+        for j in range(n):
+            value = current_values[j] * (1.0 + shocks[i, j])
+            stressed[i, j] = value
+            total += value
+        stressed_totals[i] = total
+    return current_values, stressed, portfolio_value, stressed_totals
+
+def warm_up_kernels():
+    """Compile (or load from the on-disk cache) the Numba kernels on tiny inputs"""
+    _apply_shocks(
+        np.zeros(1, dtype=np.float32),
+        np.zeros(1, dtype=np.float32),
+        np.zeros((1, 1))
+    )
 
 def run_stress_test(db, portfolio_id, scenario_type, **kwargs):
     """
@@ -13,221 +110,244 @@ def run_stress_test(db, portfolio_id, scenario_type, **kwargs):
     Returns:
         Dictionary with stress test results
     """
-    # Get portfolio data
-    from calculation_engine.portfolio import portfolio_analytics
-    portfolio_data = portfolio_analytics.get_portfolio_data(db, portfolio_id, 
-                                                          start_date=None,
-                                                          end_date=None)
+    return run_stress_tests(db, portfolio_id, [dict(kwargs, scenario_type=scenario_type)])[0]
+
+def run_stress_tests(db, portfolio_id, scenarios, portfolio_data=None):
+    """
+    Run several stress tests on a portfolio, loading and valuing it once
     
+    Args:
+        db: Database session
+        portfolio_id: Portfolio identifier
+        scenarios: List of dicts, each with a 'scenario_type' and that
+            scenario's parameters (as accepted by run_stress_test)
+        portfolio_data: Optional already loaded portfolio positions and prices
+        
+    Returns:
+        List of stress test results, in the order of scenarios
+    """
+    if portfolio_data is None:
+        portfolio_data, position_arrays = _load_portfolio(db, portfolio_id)
+    else:
+        position_arrays = _position_arrays(portfolio_data['positions'], portfolio_data['prices'])
+    
+    return [_run_scenario(portfolio_data, position_arrays, **scenario) for scenario in scenarios]
+
+# Portfolio data and valued positions per portfolio, kept briefly so a burst
+# of stress requests for one portfolio hits the database once. Entries expire
+# after _PORTFOLIO_CACHE_TTL seconds, so position changes show up within that
+# time (each pool worker holds its own copy); callers that already hold the
+# data should pass portfolio_data to run_stress_tests instead.
+_PORTFOLIO_CACHE = OrderedDict()
+_PORTFOLIO_CACHE_SIZE = 64
+_PORTFOLIO_CACHE_TTL = 300
+
+# Business days of prices loaded for a stress test; only the latest price per
+# symbol is used, and the extra days cover forward-filling holiday gaps
+STRESS_PRICE_LOOKBACK_DAYS = 10
+
+def _load_portfolio(db, portfolio_id):
+    """
+    Load recent portfolio data and value its positions, memoized briefly
+    
+    Args:
+        db: Database session
+        portfolio_id: Portfolio identifier
+        
+    Returns:
+        Tuple of (portfolio data, result of _position_arrays)
+    """
+    now = time.monotonic()
+    cached = _PORTFOLIO_CACHE.get(portfolio_id)
+    if cached is not None:
+        expires_at, result = cached
+        if now < expires_at:
+            _PORTFOLIO_CACHE.move_to_end(portfolio_id)
+            return result
+        del _PORTFOLIO_CACHE[portfolio_id]
+    
+    # Get portfolio data for a short window ending today
+    from calculation_engine.portfolio import portfolio_analytics
+    today = pd.Timestamp.today().normalize()
+    portfolio_data = portfolio_analytics.get_portfolio_data(db, portfolio_id,
+                                                          start_date=today - pd.offsets.BDay(STRESS_PRICE_LOOKBACK_DAYS),
+                                                          end_date=today)
+    
+    # Value the positions once for every scenario
+    position_arrays = _position_arrays(portfolio_data['positions'], portfolio_data['prices'])
+    
+    _PORTFOLIO_CACHE[portfolio_id] = (now + _PORTFOLIO_CACHE_TTL, (portfolio_data, position_arrays))
+    if len(_PORTFOLIO_CACHE) > _PORTFOLIO_CACHE_SIZE:
+        _PORTFOLIO_CACHE.popitem(last=False)
+    return portfolio_data, position_arrays
+
+def _run_scenario(portfolio_data, position_arrays, scenario_type, **kwargs):
+    """Dispatch one stress scenario on already valued positions"""
     # Run appropriate stress test
     if scenario_type == 'historical':
+        if 'scenario_names' in kwargs:
+            return historical_scenarios_test(portfolio_data, kwargs['scenario_names'], position_arrays)
         scenario_name = kwargs.get('scenario_name')
-        return historical_scenario_test(portfolio_data, scenario_name)
+        return historical_scenario_test(portfolio_data, scenario_name, position_arrays)
     
     elif scenario_type == 'factor_shock':
         factor_shocks = kwargs.get('factor_shocks', {})
-        return factor_shock_test(portfolio_data, factor_shocks)
+        return factor_shock_test(portfolio_data, factor_shocks, position_arrays)
     
     elif scenario_type == 'custom':
         asset_shocks = kwargs.get('asset_shocks', {})
-        return custom_shock_test(portfolio_data, asset_shocks)
+        return custom_shock_test(portfolio_data, asset_shocks, position_arrays)
     
     else:
         raise ValueError(f"Unknown stress test scenario: {scenario_type}")
 
-def historical_scenario_test(portfolio_data, scenario_name):
+def _position_arrays(positions, prices):
+    """
+    Align positions with their latest prices as flat arrays
+    
+    Args:
+        positions: DataFrame with 'symbol' and 'quantity' columns
+        prices: DataFrame of prices, one column per symbol
+        
+    Returns:
+        Tuple of (symbols, quantities, latest prices) for the positions
+        that have a price
+    """
+    symbols = positions['symbol'].to_numpy()
+    # Stored as float32, which is ample for a stress test's percentage moves
+    # and halves the memory traffic (and cached size) of the position arrays;
+    # valuation accumulates in float64 (see _apply_shocks)
+    quantities = positions['quantity'].to_numpy(dtype=np.float32)
+    
+    # Last valid price per symbol, so a gap in the final row (e.g. exchanges
+    # closed on different days) doesn't drop the position
+    latest_prices = prices.ffill().iloc[-1].reindex(symbols).to_numpy(dtype=np.float32)
+    
+    # Positions with no price at all are left out
+    priced = ~np.isnan(latest_prices)
+    skipped = priced.size - np.count_nonzero(priced)
+    if skipped:
+        logger.warning(f"Stress test skipping {skipped} position(s) with no price data")
+    return symbols[priced], quantities[priced], latest_prices[priced]
+
+def historical_scenario_test(portfolio_data, scenario_name, position_arrays=None):
     """
     Run a historical scenario stress test
     
     Args:
         portfolio_data: Portfolio positions and prices
         scenario_name: Name of historical scenario
+        position_arrays: Optional precomputed result of _position_arrays
         
     Returns:
         Dictionary with stress test results
     """
-    # Define historical scenarios (these would normally come from a database)
-    scenarios = {
-        'financial_crisis_2008': {
-            'period': ('2008-09-01', '2008-11-30'),
-            'description': '2008 Financial Crisis (Sep-Nov 2008)',
-            'asset_returns': {
-                # Example asset returns during this period
-                'SPY': -0.30,  # S&P 500
-                'QQQ': -0.35,  # NASDAQ
-                'EEM': -0.40,  # Emerging Markets
-                'TLT': 0.10,   # Long-Term Treasury
-                'GLD': 0.05,   # Gold
-                # Default for other assets
-                '_default': -0.25
-            }
-        },
-        'covid_crash_2020': {
-            'period': ('2020-02-19', '2020-03-23'),
-            'description': 'COVID-19 Market Crash (Feb-Mar 2020)',
-            'asset_returns': {
-                'SPY': -0.34,
-                'QQQ': -0.28,
-                'EEM': -0.33,
-                'TLT': 0.15,
-                'GLD': -0.05,
-                '_default': -0.30
-            }
-        },
-        'rate_shock_2022': {
-            'period': ('2022-01-01', '2022-06-30'),
-            'description': 'Interest Rate Shock (H1 2022)',
-            'asset_returns': {
-                'SPY': -0.20,
-                'QQQ': -0.30,
-                'TLT': -0.25,
-                'HYG': -0.15,
-                'SHY': -0.05,
-                '_default': -0.15
-            }
-        }
-    }
-    
-    # Check if scenario exists
-    if scenario_name not in scenarios:
-        raise ValueError(f"Unknown historical scenario: {scenario_name}")
+    return historical_scenarios_test(portfolio_data, [scenario_name], position_arrays)[scenario_name]
+
+def historical_scenarios_test(portfolio_data, scenario_names, position_arrays=None):
+    """
+    Run several historical scenario stress tests as one matrix operation
     
-    # Get scenario details
-    scenario = scenarios[scenario_name]
+    Args:
+        portfolio_data: Portfolio positions and prices
+        scenario_names: List of historical scenario names
+        position_arrays: Optional precomputed result of _position_arrays
+        
+    Returns:
+        Dictionary of scenario name to stress test results
+    """
+    # Check if scenarios exist
+    for scenario_name in scenario_names:
+        if scenario_name not in HISTORICAL_SCENARIOS:
+            raise ValueError(f"Unknown historical scenario: {scenario_name}")
     
     # Get portfolio positions and current values
-    positions = portfolio_data['positions']
-    prices = portfolio_data['prices']
-    
-    # Calculate current portfolio value
-    portfolio_value = 0
-    position_values = {}
-    
-    for idx, position in positions.iterrows():
-        symbol = position['symbol']
-        quantity = position['quantity']
-        
-        # Get latest price
-        if symbol in prices.columns:
-            latest_price = prices[symbol].iloc[-1]
-            position_value = quantity * latest_price
-            position_values[symbol] = {
+    if position_arrays is None:
+        position_arrays = _position_arrays(portfolio_data['positions'], portfolio_data['prices'])
+    symbols, quantities, latest_prices = position_arrays
+    
+    # Scenario x symbol matrix of shock returns (scenario default where unlisted)
+    shock_returns = np.empty((len(scenario_names), len(symbols)))
+    for i, scenario_name in enumerate(scenario_names):
+        asset_returns, default_return = _SCENARIO_SHOCKS[scenario_name]
+        shock_returns[i] = asset_returns.reindex(symbols).fillna(default_return).to_numpy()
+    
+    # Value positions and apply every scenario's shocks in one compiled pass
+    current_values, stressed, portfolio_value, total_stressed_values = _apply_shocks(
+        quantities, latest_prices, shock_returns
+    )
+    
+    results = {}
+    for i, scenario_name in enumerate(scenario_names):
+        scenario = HISTORICAL_SCENARIOS[scenario_name]
+        stressed_values = {
+            symbol: {
                 'symbol': symbol,
-                'quantity': float(quantity),
-                'current_price': float(latest_price),
-                'current_value': float(position_value)
+                'current_value': current_value,
+                'shock_return': shock_return,
+                'stressed_value': stressed_value,
+                'value_change': stressed_value - current_value,
+                'pct_change': shock_return
             }
-            portfolio_value += position_value
-    
-    # Apply scenario shocks to each position
-    stressed_values = {}
-    total_stressed_value = 0
-    
-    for symbol, position in position_values.items():
-        # Get scenario return for this asset (or default)
-        if symbol in scenario['asset_returns']:
-            shock_return = scenario['asset_returns'][symbol]
-        else:
-            shock_return = scenario['asset_returns']['_default']
+            for symbol, current_value, shock_return, stressed_value
+            in zip(symbols, current_values, shock_returns[i], stressed[i])
+        }
         
-        # Calculate stressed value
-        stressed_price = position['current_price'] * (1 + shock_return)
-        stressed_value = position['quantity'] * stressed_price
+        # Calculate overall portfolio impact
+        total_stressed_value = total_stressed_values[i]
+        portfolio_change = total_stressed_value - portfolio_value
+        portfolio_pct_change = portfolio_change / portfolio_value if portfolio_value > 0 else 0
         
-        stressed_values[symbol] = {
-            'symbol': symbol,
-            'current_value': float(position['current_value']),
-            'shock_return': float(shock_return),
-            'stressed_value': float(stressed_value),
-            'value_change': float(stressed_value - position['current_value']),
-            'pct_change': float(shock_return)
+        results[scenario_name] = {
+            'scenario_name': scenario_name,
+            'scenario_description': scenario['description'],
+            'scenario_period': scenario['period'],
+            'current_portfolio_value': portfolio_value,
+            'stressed_portfolio_value': total_stressed_value,
+            'absolute_change': portfolio_change,
+            'percentage_change': portfolio_pct_change,
+            'position_impacts': stressed_values
         }
-        
-        total_stressed_value += stressed_value
-    
-    # Calculate overall portfolio impact
-    portfolio_change = total_stressed_value - portfolio_value
-    portfolio_pct_change = portfolio_change / portfolio_value if portfolio_value > 0 else 0
     
-    return {
-        'scenario_name': scenario_name,
-        'scenario_description': scenario['description'],
-        'scenario_period': scenario['period'],
-        'current_portfolio_value': float(portfolio_value),
-        'stressed_portfolio_value': float(total_stressed_value),
-        'absolute_change': float(portfolio_change),
-        'percentage_change': float(portfolio_pct_change),
-        'position_impacts': stressed_values
-    }
+    return results
 
-def factor_shock_test(portfolio_data, factor_shocks):
+def factor_shock_test(portfolio_data, factor_shocks, position_arrays=None):
     """
     Run a factor-based stress test
     
     Args:
         portfolio_data: Portfolio positions and prices
         factor_shocks: Dictionary of factor shock values
+        position_arrays: Optional precomputed result of _position_arrays
         
     Returns:
         Dictionary with stress test results
     """
     # This would normally use factor exposure data from the database
-    # For now, implement a simplified version
+    # For now, use the sample FACTOR_BETAS
     
     # Calculate current portfolio value
-    positions = portfolio_data['positions']
-    prices = portfolio_data['prices']
-    
-    # Get factor exposures for the portfolio
-    # In a real implementation, this would be retrieved from the database
-    # or calculated using the factor model
-    
-    # Sample factor betas for demonstration
-    factor_betas = {
-        'Market': 1.05,
-        'Size': 0.2,
-        'Value': -0.15,
-        'Momentum': 0.1,
-        'Quality': 0.25,
-        'Volatility': -0.3
+    if position_arrays is None:
+        position_arrays = _position_arrays(portfolio_data['positions'], portfolio_data['prices'])
+    _, quantities, latest_prices = position_arrays
+    portfolio_value = quantities.astype(np.float64) @ latest_prices.astype(np.float64)
+    
+    # Impact = Factor Beta * Factor Shock (factors without a beta are ignored)
+    shock_vec = np.array([factor_shocks.get(factor, 0.0) for factor in _FACTOR_KEYS], dtype=np.float64)
+    impacts = _FACTOR_BETAS * shock_vec
+    total_factor_impact = impacts.sum()
+    
+    factor_impacts = {
+        factor: {
+            'factor': factor,
+            'shock': shock,
+            'beta': beta,
+            'impact': impact
+        }
+        for factor, beta, shock, impact in zip(_FACTOR_KEYS, _FACTOR_BETAS, shock_vec, impacts)
+        if factor in factor_shocks
     }
     
-    # Calculate portfolio value
-    portfolio_value = 0
-    position_values = {}
-    
-    for idx, position in positions.iterrows():
-        symbol = position['symbol']
-        quantity = position['quantity']
-        
-        # Get latest price
-        if symbol in prices.columns:
-            latest_price = prices[symbol].iloc[-1]
-            position_value = quantity * latest_price
-            position_values[symbol] = {
-                'symbol': symbol,
-                'quantity': float(quantity),
-                'current_price': float(latest_price),
-                'current_value': float(position_value)
-            }
-            portfolio_value += position_value
-    
-    # Calculate impact of factor shocks
-    total_factor_impact = 0
-    factor_impacts = {}
-    
-    for factor, shock in factor_shocks.items():
-        if factor in factor_betas:
-            # Impact = Factor Beta * Factor Shock
-            impact = factor_betas[factor] * shock
-            factor_impacts[factor] = {
-                'factor': factor,
-                'shock': float(shock),
-                'beta': float(factor_betas[factor]),
-                'impact': float(impact)
-            }
-            total_factor_impact += impact
-    
     # Calculate overall portfolio impact
     stressed_value = portfolio_value * (1 + total_factor_impact)
     portfolio_change = stressed_value - portfolio_value
@@ -236,69 +356,52 @@ def factor_shock_test(portfolio_data, factor_shocks):
     return {
         'scenario_type': 'factor_shock',
         'factor_shocks': factor_shocks,
-        'current_portfolio_value': float(portfolio_value),
-        'stressed_portfolio_value': float(stressed_value),
-        'absolute_change': float(portfolio_change),
-        'percentage_change': float(portfolio_pct_change),
+        'current_portfolio_value': portfolio_value,
+        'stressed_portfolio_value': stressed_value,
+        'absolute_change': portfolio_change,
+        'percentage_change': portfolio_pct_change,
         'factor_impacts': factor_impacts
     }
 
-def custom_shock_test(portfolio_data, asset_shocks):
+def custom_shock_test(portfolio_data, asset_shocks, position_arrays=None):
     """
     Run a custom asset-level stress test
     
     Args:
         portfolio_data: Portfolio positions and prices
         asset_shocks: Dictionary of asset-specific shock values
+        position_arrays: Optional precomputed result of _position_arrays
         
     Returns:
         Dictionary with stress test results
     """
-    # Calculate current portfolio value and apply custom shocks
-    positions = portfolio_data['positions']
-    prices = portfolio_data['prices']
-    
-    # Calculate portfolio value
-    portfolio_value = 0
-    position_values = {}
-    
-    for idx, position in positions.iterrows():
-        symbol = position['symbol']
-        quantity = position['quantity']
-        
-        # Get latest price
-        if symbol in prices.columns:
-            latest_price = prices[symbol].iloc[-1]
-            position_value = quantity * latest_price
-            position_values[symbol] = {
-                'symbol': symbol,
-                'quantity': float(quantity),
-                'current_price': float(latest_price),
-                'current_value': float(position_value)
-            }
-            portfolio_value += position_value
-    
-    # Apply asset-specific shocks
-    stressed_values = {}
-    total_stressed_value = 0
-    
-    for symbol, position in position_values.items():
-        # Get shock for this asset (or 0 if not specified)
-        shock = asset_shocks.get(symbol, 0)
-        
-        # Calculate stressed value
-        stressed_value = position['current_value'] * (1 + shock)
-        
-        stressed_values[symbol] = {
+    # Calculate current portfolio value
+    if position_arrays is None:
+        position_arrays = _position_arrays(portfolio_data['positions'], portfolio_data['prices'])
+    symbols, quantities, latest_prices = position_arrays
+    
+    # Get shock for each asset (or 0 if not specified)
+    shocks = pd.Series(asset_shocks, dtype=np.float64).reindex(symbols).fillna(0.0).to_numpy()
+    
+    # Value positions and apply asset-specific shocks in one compiled pass
+    current_values, stressed, portfolio_value, stressed_totals = _apply_shocks(
+        quantities, latest_prices, shocks.reshape(1, -1)
+    )
+    stressed = stressed[0]
+    total_stressed_value = stressed_totals[0]
+    
+    stressed_values = {
+        symbol: {
             'symbol': symbol,
-            'current_value': float(position['current_value']),
-            'shock': float(shock),
-            'stressed_value': float(stressed_value),
-            'value_change': float(stressed_value - position['current_value']),
-            'pct_change': float(shock)
+            'current_value': current_value,
+            'shock': shock,
+            'stressed_value': stressed_value,
+            'value_change': stressed_value - current_value,
+            'pct_change': shock
         }
-        
-        total_stressed_value += stressed_value
+        for symbol, current_value, shock, stressed_value
+        in zip(symbols, current_values, shocks, stressed)
+    }
     
     # Calculate overall portfolio impact
     portfolio_change = total_stressed_value - portfolio_value
@@ -306,9 +409,9 @@ def custom_shock_test(portfolio_data, asset_shocks):
     
     return {
         'scenario_type': 'custom_shock',
-        'current_portfolio_value': float(portfolio_value),
-        'stressed_portfolio_value': float(total_stressed_value),
-        'absolute_change': float(portfolio_change),
-        'percentage_change': float(portfolio_pct_change),
+        'current_portfolio_value': portfolio_value,
+        'stressed_portfolio_value': total_stressed_value,
+        'absolute_change': portfolio_change,
+        'percentage_change': portfolio_pct_change,
         'position_impacts': stressed_values
     }
\ No newline at end of file
@@ -0,0 +1,89 @@
+# dags/indicators_numba.py
+# Compiled technical indicator kernels, kept out of the pipeline module so the
+# numba import is only paid by the task that uses them, not on every parse
+import numpy as np
+from numba import njit
+
+SMA_WINDOWS = np.array([20, 50, 200], dtype=np.int64)
+RSI_WINDOW = 14
+
+@njit(cache=True, nogil=True)
+def technical_indicators(close, starts, sma_windows, rsi_window):
+    """
+    Simple moving averages and RSI for every symbol in one O(n) sweep
+
+    Each window keeps a running sum (add the new value, subtract the one
+    leaving), and all indicators are updated in the same pass over the
+    closes. Results match pandas rolling(window).mean(): NaN until a window
+    is full or while it contains a NaN close. The RSI is the simple-mean
+    variant, with undefined day-over-day changes counted as 0.
+
+    Args:
+        close: (n,) float64 closes, grouped by symbol and sorted by date
+        starts: Ascending start offset of each symbol's rows in close
+        sma_windows: int64 array of SMA window lengths
+        rsi_window: RSI window length
+
+    Returns:
+        Tuple of ((len(sma_windows), n) SMAs, (n,) RSI)
+    """
+    n = close.size
+    k = sma_windows.size
+    sma = np.full((k, n), np.nan)
+    rsi = np.full(n, np.nan)
+    sums = np.empty(k)
+    missing = np.empty(k, dtype=np.int64)
+    gains = np.empty(n)
+    losses = np.empty(n)
+
+    for g in range(starts.size):
+        start = starts[g]
+        stop = starts[g + 1] if g + 1 < starts.size else n
+        sums[:] = 0.0
+        missing[:] = 0
+        gain_sum = 0.0
+        loss_sum = 0.0
+
+        for i in range(start, stop):
+            x = close[i]
+
+            # Simple moving averages
+            for j in range(k):
+                w = sma_windows[j]
+                if np.isnan(x):
+                    missing[j] += 1
+                else:
+                    sums[j] += x
+                if i - w >= start:
+                    y = close[i - w]
+                    if np.isnan(y):
+                        missing[j] -= 1
+                    else:
+                        sums[j] -= y
+                if i - start + 1 >= w and missing[j] == 0:
+                    sma[j, i] = sums[j] / w
+
+            # Relative Strength Index
+            gain = 0.0
+            loss = 0.0
+            if i > start:
+                delta = x - close[i - 1]
+                # Conditional expressions rather than if/elif blocks, so LLVM
+                # can lower them to selects; comparisons with a NaN change
+                # are false, so it counts as 0 like where(delta > 0, 0)
+                gain = delta if delta > 0.0 else 0.0
+                loss = -delta if delta < 0.0 else 0.0
+            gains[i] = gain
+            losses[i] = loss
+            gain_sum += gain
+            loss_sum += loss
+            if i - rsi_window >= start:
+                gain_sum -= gains[i - rsi_window]
+                loss_sum -= losses[i - rsi_window]
+            if i - start + 1 >= rsi_window:
+                if loss_sum > 0:
+                    rsi[i] = 100.0 - 100.0 / (1.0 + gain_sum / loss_sum)
+                elif gain_sum > 0:
+                    rsi[i] = 100.0
+
+    return sma, rsi
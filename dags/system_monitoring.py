@@ -1,10 +1,11 @@
 # dags/system_monitoring.py
 from airflow import DAG
+from airflow.exceptions import AirflowException
 from airflow.operators.python import PythonOperator
-from airflow.providers.http.operators.http import SimpleHttpOperator
-from airflow.providers.postgres.operators.postgres import PostgresOperator
+from airflow.providers.http.hooks.http import HttpHook
+from airflow.providers.postgres.hooks.postgres import PostgresHook
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import json
 import logging
 
 default_args = {
@@ -26,41 +27,8 @@ dag = DAG(
     tags=['equitylens', 'monitoring'],
 )
 
-# Check API health
-check_api_health = SimpleHttpOperator(
-    task_id='check_api_health',
-    http_conn_id='equitylens_api',
-    endpoint='health',
-    method='GET',
-    response_check=lambda response: response.json()['status'] == 'healthy',
-    log_response=True,
-    dag=dag,
-)
-
-# Check Calculation Engine health
-check_calculation_engine_health = SimpleHttpOperator(
-    task_id='check_calculation_engine_health',
-    http_conn_id='equitylens_calculation_engine',
-    endpoint='health',
-    method='GET',
-    response_check=lambda response: response.json()['status'] == 'healthy',
-    log_response=True,
-    dag=dag,
-)
-
-# Check database health
-check_database_health = PostgresOperator(
-    task_id='check_database_health',
-    postgres_conn_id='equitylens_db',
-    sql='SELECT 1;',
-    dag=dag,
-)
-
-# Check data freshness
-check_data_freshness = PostgresOperator(
-    task_id='check_data_freshness',
-    postgres_conn_id='equitylens_db',
-    sql="""
+# Data freshness check: is there SPY data from the last two days?
+DATA_FRESHNESS_SQL = """
     SELECT 
         CASE 
             WHEN MAX(date) > NOW() - INTERVAL '2 days' THEN 1
@@ -68,55 +36,77 @@ check_data_freshness = PostgresOperator(
         END as is_fresh
     FROM market_data.daily_prices
     WHERE symbol = 'SPY';
-    """,
-    dag=dag,
-)
+"""
 
-def process_monitoring_results(**kwargs):
-    """Process the results of the monitoring tasks"""
-    ti = kwargs['ti']
-    
+def check_service_health(http_conn_id):
+    """Check that a service's /health endpoint reports healthy"""
+    response = HttpHook(method='GET', http_conn_id=http_conn_id).run('health')
+    logging.info(f"{http_conn_id} health: {response.text}")
+    return response.json()['status'] == 'healthy'
+
+def check_database_health():
+    """Check that the database answers a trivial query"""
+    return PostgresHook(postgres_conn_id='equitylens_db').get_first('SELECT 1;') is not None
+
+def check_data_freshness():
+    """Check that market data has been loaded recently"""
+    row = PostgresHook(postgres_conn_id='equitylens_db').get_first(DATA_FRESHNESS_SQL)
+    return bool(row) and row[0] == 1
+
+def _run_check(name, check, *args):
+    """Run one check, treating any error as a failed check"""
     try:
-        api_result = ti.xcom_pull(task_ids='check_api_health')
-        calc_engine_result = ti.xcom_pull(task_ids='check_calculation_engine_health')
-        db_result = ti.xcom_pull(task_ids='check_database_health')
-        data_freshness = ti.xcom_pull(task_ids='check_data_freshness')
+        return check(*args)
+    except Exception as e:
+        logging.error(f"{name} health check raised: {e}")
+        return False
+
+def run_health_checks(**kwargs):
+    """
+    Run all health checks concurrently in a single task and log the results
+    
+    Each check is I/O bound and takes milliseconds, so running them on a
+    thread pool makes the task take as long as the slowest check, without
+    scheduling a worker slot per check.
+    """
+    checks = {
+        'api': (check_service_health, 'equitylens_api'),
+        'calculation_engine': (check_service_health, 'equitylens_calculation_engine'),
+        'database': (check_database_health,),
+        'data_freshness': (check_data_freshness,),
+    }
+    
+    with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+        futures = {name: pool.submit(_run_check, name, *check) for name, check in checks.items()}
+        results = {name: future.result() for name, future in futures.items()}
+    
+    all_healthy = all(results.values())
+    
+    if all_healthy:
+        logging.info("All systems are healthy")
+    else:
+        logging.error("Some systems are unhealthy!")
         
-        all_healthy = all([
-            api_result is not None,
-            calc_engine_result is not None,
-            db_result is not None,
-            data_freshness and data_freshness[0][0] == 1
-        ])
+        if not results['api']:
+            logging.error("API health check failed")
         
-        if all_healthy:
-            logging.info("All systems are healthy")
-        else:
-            logging.error("Some systems are unhealthy!")
-            
-            if api_result is None:
-                logging.error("API health check failed")
-            
-            if calc_engine_result is None:
-                logging.error("Calculation Engine health check failed")
-            
-            if db_result is None:
-                logging.error("Database health check failed")
-            
-            if not data_freshness or data_freshness[0][0] != 1:
-                logging.error("Data freshness check failed - market data may be stale")
+        if not results['calculation_engine']:
+            logging.error("Calculation Engine health check failed")
         
-        return all_healthy
-    except Exception as e:
-        logging.error(f"Error processing monitoring results: {e}")
-        return False
+        if not results['database']:
+            logging.error("Database health check failed")
+        
+        if not results['data_freshness']:
+            logging.error("Data freshness check failed - market data may be stale")
+        
+        # Fail the task so the failure email still goes out
+        raise AirflowException(f"Unhealthy systems: {[name for name, ok in results.items() if not ok]}")
+    
+    return all_healthy
 
-process_results = PythonOperator(
-    task_id='process_monitoring_results',
-    python_callable=process_monitoring_results,
+run_checks = PythonOperator(
+    task_id='run_health_checks',
+    python_callable=run_health_checks,
     provide_context=True,
     dag=dag,
 )
-
-# Set task dependencies
-[check_api_health, check_calculation_engine_health, check_database_health, check_data_freshness] >> process_results
\ No newline at end of file
@@ -1,5 +1,6 @@
 # tests/integration_test.py
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
 import pandas as pd
@@ -8,16 +9,64 @@ from datetime import datetime, timedelta
 API_URL = "http://localhost:8000"
 CALC_ENGINE_URL = "http://localhost:8001"
 
+# One session for the whole run so requests reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+def poll_job(job_id, label, timeout=30):
+    """
+    Poll a calculation job until it completes, backing off from 50 ms to 1 s
+    
+    Returns:
+        The job's result
+    """
+    delay = 0.05
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = SESSION.get(f"{CALC_ENGINE_URL}/job/{job_id}")
+        assert response.status_code == 200
+        job_status = response.json()
+        
+        if job_status["status"] == "completed":
+            print(f"✅ {label} completed")
+            return job_status["result"]
+        elif job_status["status"] == "failed":
+            assert False, f"{label} failed: {job_status['error']}"
+        
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    
+    assert False, f"{label} timed out"
+
+def run_job(endpoint, payload, label):
+    """
+    Start a calculation engine job and wait for it to complete
+    
+    Args:
+        endpoint: Calculation engine endpoint, e.g. "risk-analysis"
+        payload: Request body
+        label: Lower-case job description used in messages
+        
+    Returns:
+        The job's result
+    """
+    response = SESSION.post(f"{CALC_ENGINE_URL}/{endpoint}", json=payload)
+    assert response.status_code == 200
+    job_id = response.json()
+    print(f"✅ Started {label} with job ID: {job_id}")
+    
+    return poll_job(job_id, label.capitalize())
+
 def test_api_health():
     """Test API health endpoint"""
-    response = requests.get(f"{API_URL}/health")
+    response = SESSION.get(f"{API_URL}/health")
     assert response.status_code == 200
     assert response.json()["status"] == "healthy"
     print("✅ API health check passed")
 
 def test_calculation_engine_health():
     """Test calculation engine health endpoint"""
-    response = requests.get(f"{CALC_ENGINE_URL}/health")
+    response = SESSION.get(f"{CALC_ENGINE_URL}/health")
     assert response.status_code == 200
     assert response.json()["status"] == "healthy"
     print("✅ Calculation engine health check passed")
@@ -31,7 +80,7 @@ def create_test_portfolio():
         "currency": "USD"
     }
     
-    response = requests.post(f"{API_URL}/portfolios", json=portfolio_data)
+    response = SESSION.post(f"{API_URL}/portfolios", json=portfolio_data)
     assert response.status_code == 201
     portfolio = response.json()
     portfolio_id = portfolio["id"]
@@ -46,10 +95,9 @@ def create_test_portfolio():
         {"symbol": "TSLA", "quantity": 30, "entry_date": (datetime.now() - timedelta(days=300)).strftime("%Y-%m-%d"), "entry_price": 700.0},
     ]
     
-    for position in positions:
-        position["portfolio_id"] = portfolio_id
-        response = requests.post(f"{API_URL}/portfolios/{portfolio_id}/positions", json=position)
-        assert response.status_code == 201
+    response = SESSION.post(f"{API_URL}/portfolios/{portfolio_id}/positions/bulk", json=positions)
+    assert response.status_code == 201
+    assert len(response.json()) == len(positions)
     
     print(f"✅ Added {len(positions)} positions to test portfolio")
     return portfolio_id
@@ -62,30 +110,7 @@ def test_portfolio_analytics(portfolio_id):
         "end_date": datetime.now().strftime("%Y-%m-%d")
     }
     
-    # Start the calculation job
-    response = requests.post(f"{CALC_ENGINE_URL}/portfolio-analytics", json=request_data)
-    assert response.status_code == 200
-    job_id = response.json()
-    print(f"✅ Started portfolio analytics calculation with job ID: {job_id}")
-    
-    # Poll for job completion
-    max_attempts = 30
-    attempt = 0
-    while attempt < max_attempts:
-        response = requests.get(f"{CALC_ENGINE_URL}/job/{job_id}")
-        assert response.status_code == 200
-        job_status = response.json()
-        
-        if job_status["status"] == "completed":
-            print(f"✅ Portfolio analytics calculation completed")
-            return job_status["result"]
-        elif job_status["status"] == "failed":
-            assert False, f"Portfolio analytics calculation failed: {job_status['error']}"
-        
-        attempt += 1
-        time.sleep(1)
-    
-    assert False, "Portfolio analytics calculation timed out"
+    return run_job("portfolio-analytics", request_data, "portfolio analytics calculation")
 
 def test_risk_analysis(portfolio_id):
     """Test risk analysis calculation"""
@@ -99,30 +124,7 @@ def test_risk_analysis(portfolio_id):
         }
     }
     
-    # Start the calculation job
-    response = requests.post(f"{CALC_ENGINE_URL}/risk-analysis", json=request_data)
-    assert response.status_code == 200
-    job_id = response.json()
-    print(f"✅ Started risk analysis calculation with job ID: {job_id}")
-    
-    # Poll for job completion
-    max_attempts = 30
-    attempt = 0
-    while attempt < max_attempts:
-        response = requests.get(f"{CALC_ENGINE_URL}/job/{job_id}")
-        assert response.status_code == 200
-        job_status = response.json()
-        
-        if job_status["status"] == "completed":
-            print(f"✅ Risk analysis calculation completed")
-            return job_status["result"]
-        elif job_status["status"] == "failed":
-            assert False, f"Risk analysis calculation failed: {job_status['error']}"
-        
-        attempt += 1
-        time.sleep(1)
-    
-    assert False, "Risk analysis calculation timed out"
+    return run_job("risk-analysis", request_data, "risk analysis calculation")
 
 def test_factor_analysis(portfolio_id):
     """Test factor analysis calculation"""
@@ -133,30 +135,7 @@ def test_factor_analysis(portfolio_id):
         "end_date": datetime.now().strftime("%Y-%m-%d")
     }
     
-    # Start the calculation job
-    response = requests.post(f"{CALC_ENGINE_URL}/factor-analysis", json=request_data)
-    assert response.status_code == 200
-    job_id = response.json()
-    print(f"✅ Started factor analysis calculation with job ID: {job_id}")
-    
-    # Poll for job completion
-    max_attempts = 30
-    attempt = 0
-    while attempt < max_attempts:
-        response = requests.get(f"{CALC_ENGINE_URL}/job/{job_id}")
-        assert response.status_code == 200
-        job_status = response.json()
-        
-        if job_status["status"] == "completed":
-            print(f"✅ Factor analysis calculation completed")
-            return job_status["result"]
-        elif job_status["status"] == "failed":
-            assert False, f"Factor analysis calculation failed: {job_status['error']}"
-        
-        attempt += 1
-        time.sleep(1)
-    
-    assert False, "Factor analysis calculation timed out"
+    return run_job("factor-analysis", request_data, "factor analysis calculation")
 
 def test_optimization(portfolio_id):
     """Test portfolio optimization"""
@@ -173,30 +152,7 @@ def test_optimization(portfolio_id):
         "end_date": datetime.now().strftime("%Y-%m-%d")
     }
     
-    # Start the calculation job
-    response = requests.post(f"{CALC_ENGINE_URL}/optimization", json=request_data)
-    assert response.status_code == 200
-    job_id = response.json()
-    print(f"✅ Started portfolio optimization with job ID: {job_id}")
-    
-    # Poll for job completion
-    max_attempts = 30
-    attempt = 0
-    while attempt < max_attempts:
-        response = requests.get(f"{CALC_ENGINE_URL}/job/{job_id}")
-        assert response.status_code == 200
-        job_status = response.json()
-        
-        if job_status["status"] == "completed":
-            print(f"✅ Portfolio optimization completed")
-            return job_status["result"]
-        elif job_status["status"] == "failed":
-            assert False, f"Portfolio optimization failed: {job_status['error']}"
-        
-        attempt += 1
-        time.sleep(1)
-    
-    assert False, "Portfolio optimization timed out"
+    return run_job("optimization", request_data, "portfolio optimization")
 
 def run_integration_test():
     """Run full integration test"""
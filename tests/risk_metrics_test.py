@@ -0,0 +1,65 @@
+# tests/risk_metrics_test.py
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# The calculation engine modules import each other as top-level packages
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'calculation_engine'))
+from risk import risk_metrics
+
+def test_risk_moments_constant_returns():
+    """Constant returns have zero volatility and undefined skew/kurtosis"""
+    mean, volatility, skewness, kurtosis = risk_metrics._risk_moments(np.full(5, 0.01))
+    assert math.isclose(mean, 0.01)
+    assert math.isclose(volatility, 0.0, abs_tol=1e-12)
+    assert math.isnan(skewness)
+    assert math.isnan(kurtosis)
+    print("✅ Constant-return moments are NaN-safe")
+
+def test_risk_moments_single_observation():
+    """A single return has a mean but no sample volatility"""
+    mean, volatility, skewness, kurtosis = risk_metrics._risk_moments(np.array([0.02]))
+    assert math.isclose(mean, 0.02)
+    assert math.isnan(volatility)
+    assert math.isnan(skewness)
+    assert math.isnan(kurtosis)
+    print("✅ Single-observation moments are NaN-safe")
+
+def test_risk_moments_empty():
+    """An empty window gives NaN for every moment"""
+    assert all(math.isnan(m) for m in risk_metrics._risk_moments(np.empty(0)))
+    print("✅ Empty-window moments are NaN-safe")
+
+def test_historical_var_batch_matches_quantile_with_ties():
+    """Batch VaR is the 'lower' quantile and CVaR includes every tied tail return"""
+    values = np.array([0.03, -0.02, 0.01, -0.05, -0.02, 0.0, -0.02, 0.01, -0.05, 0.02])
+    confidence_levels = [0.5, 0.75, 0.8, 0.9, 0.95, 0.99]
+    results = risk_metrics.calculate_historical_var_batch(pd.Series(values), confidence_levels)
+    
+    for confidence_level, result in zip(confidence_levels, results):
+        var_value = np.quantile(values, 1 - confidence_level, method='lower')
+        cvar_value = values[values <= var_value].mean()
+        assert math.isclose(result['var'], -var_value)
+        assert math.isclose(result['cvar'], -cvar_value)
+        assert result['observations'] == len(values)
+    print("✅ Batch historical VaR matches np.quantile(method='lower') with ties")
+
+def test_historical_var_batch_empty():
+    """An empty window reports no VaR instead of raising"""
+    results = risk_metrics.calculate_historical_var_batch(pd.Series([], dtype=float), [0.95, 0.99])
+    assert [r['confidence_level'] for r in results] == [0.95, 0.99]
+    for result in results:
+        assert result['var'] is None
+        assert result['cvar'] is None
+        assert result['observations'] == 0
+    print("✅ Empty-window historical VaR is reported as None")
+
+if __name__ == "__main__":
+    test_risk_moments_constant_returns()
+    test_risk_moments_single_observation()
+    test_risk_moments_empty()
+    test_historical_var_batch_matches_quantile_with_ties()
+    test_historical_var_batch_empty()